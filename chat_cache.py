@@ -0,0 +1,57 @@
+"""Exact-match response cache for chat completion requests.
+
+Repeated requests with the same model, messages and options skip the LLM
+round trip. Only exact matches are served: a "similar" geospatial question
+(e.g. Paris, France vs. Paris, Texas) usually needs a different answer.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+def _to_jsonable(obj: Any) -> Any:
+    """Serialize SDK objects (pydantic models) that appear inside messages."""
+
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return str(obj)
+
+
+class ChatCache:
+    """LRU cache of chat completion responses keyed on the full request."""
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    @staticmethod
+    def key(**request: Any) -> str:
+        """Return a stable digest for a ``chat.completions.create`` request."""
+
+        # The request carries the whole history, so this runs over every message each turn
+        if orjson is not None:
+            payload = orjson.dumps(request, option=orjson.OPT_SORT_KEYS, default=_to_jsonable)
+        else:
+            payload = json.dumps(request, sort_keys=True, default=_to_jsonable).encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: Any) -> None:
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -2,13 +2,18 @@
 
 > pip install openai
 """
+import io
 import json
 import argparse
 import os
-from openai import OpenAI
 
 from validation import format_invalid_notes, parse_coordinate_pairs
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to per-value conversion
+    np = None
+
 """
 Convert Decimal Degrees (DD) to Degrees-Minutes-Seconds (DMS) via Python math,
 using OpenAI function-calling to pass data through the LLM.
@@ -16,30 +21,30 @@ using OpenAI function-calling to pass data through the LLM.
 
 # Conversion helper functions
 def dd_to_dms_value(dd: float):
-    """Convert a decimal degree value to DMS components with float seconds using total seconds."""
+    """Convert a decimal degree value to DMS components with float seconds.
+
+    Works in whole centiseconds so rounding to the displayed precision also
+    carries any seconds/minutes roll-over without extra branches.
+    """
     sign = -1 if dd < 0 else 1
-    abs_dd = abs(dd)
-    # Total seconds from decimal degrees
-    total_seconds = abs_dd * 3600.0
-    # Degrees
-    deg = int(total_seconds // 3600)
-    # Remaining seconds after degrees
-    rem = total_seconds - deg * 3600
-    # Minutes
-    minutes = int(rem // 60)
-    # Remaining seconds after minutes
-    seconds = rem - minutes * 60
-
-    # Handle roll-over at seconds >= 59.9995 → increment minute
-    if seconds >= 59.9995:
-        seconds = 0.0
-        minutes += 1
-    # Handle roll-over at minutes == 60 → increment degree
-    if minutes == 60:
-        minutes = 0
-        deg += 1
-
-    return deg * sign, minutes, seconds
+    total_cs = int(round(abs(dd) * 360000))
+    deg, rem = divmod(total_cs, 360000)
+    minutes, cs = divmod(rem, 6000)
+    return deg * sign, minutes, cs / 100.0
+
+def dd_to_dms_arrays(dd):
+    """Vectorized `dd_to_dms_value` for a NumPy array of decimal degrees."""
+    total_cs = np.rint(np.abs(dd) * 360000).astype(np.int64)
+    deg, rem = np.divmod(total_cs, 360000)
+    minutes, cs = np.divmod(rem, 6000)
+    return np.where(dd < 0, -deg, deg), minutes, cs / 100.0
+
+def _dms_components(values):
+    """Return (deg, minutes, seconds) tuples for each decimal degree value."""
+    if np is None:
+        return list(map(dd_to_dms_value, values))
+    parts = dd_to_dms_arrays(np.asarray(values, dtype=np.float64))
+    return list(zip(*(p.tolist() for p in parts)))
 
 def format_dms(deg: int, minutes: int, seconds: float, is_lat: bool):
     """Format DMS components into a string with two decimal places for seconds."""
@@ -54,21 +59,22 @@ def convert_dd_to_dms(coordinates_str: str) -> str:
     Convert newline- or semicolon-delimited DD lat,lon pairs to a markdown table of DMS.
     """
     pairs, invalid_entries = parse_coordinate_pairs(coordinates_str)
-    rows = []
-    for lat_dd, lon_dd in pairs:
-        lat_d, lat_m, lat_s = dd_to_dms_value(lat_dd)
-        lon_d, lon_m, lon_s = dd_to_dms_value(lon_dd)
-        lat_dms = format_dms(lat_d, lat_m, lat_s, True)
-        lon_dms = format_dms(lon_d, lon_m, lon_s, False)
-        rows.append((lat_dd, lon_dd, lat_dms, lon_dms))
-    # Build markdown table
-    table = [
-        "| Latitude (DD) | Longitude (DD) | Latitude (DMS) | Longitude (DMS) |",
+    lats = [lat for lat, _ in pairs]
+    lons = [lon for _, lon in pairs]
+    # Build markdown table in a single buffer
+    buf = io.StringIO()
+    buf.write(
+        "| Latitude (DD) | Longitude (DD) | Latitude (DMS) | Longitude (DMS) |\n"
         "|--------------:|---------------:|---------------|---------------|"
-    ]
-    for lat_dd, lon_dd, lat_dms, lon_dms in rows:
-        table.append(f"| {lat_dd:14.6f} | {lon_dd:15.6f} | {lat_dms:13} | {lon_dms:13} |")
-    return "\n".join(table) + format_invalid_notes(invalid_entries)
+    )
+    for lat_dd, lon_dd, lat_parts, lon_parts in zip(
+        lats, lons, _dms_components(lats), _dms_components(lons)
+    ):
+        lat_dms = format_dms(*lat_parts, True)
+        lon_dms = format_dms(*lon_parts, False)
+        buf.write(f"\n| {lat_dd:14.6f} | {lon_dd:15.6f} | {lat_dms:13} | {lon_dms:13} |")
+    buf.write(format_invalid_notes(invalid_entries))
+    return buf.getvalue()
 
 def main():
     parser = argparse.ArgumentParser(description="DD to DMS converter")
@@ -84,6 +90,9 @@ def main():
     )
     args = parser.parse_args()
 
+    # Imported here so library users and --help skip the OpenAI SDK import
+    from openai import OpenAI
+
     # Initialize OpenAI client
     client = OpenAI(base_url=args.base_url, api_key=args.api_key)
 
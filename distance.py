@@ -2,50 +2,170 @@
 
 from __future__ import annotations
 
+import io
 import math
-import re
+from array import array
+from functools import lru_cache
 from typing import List, Sequence, Tuple
 
-from validation import format_invalid_notes, is_valid_lat_lon
+from validation import (
+    format_invalid_notes,
+    is_valid_lat_lon,
+    split_entries,
+    split_tokens,
+    valid_lat_lon_mask,
+)
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to the scalar kernel
+    np = None
 
-def _parse_distance_pairs(
-    text: str,
-) -> Tuple[List[Tuple[float, float, float, float]], List[Tuple[str, str]]]:
-    pairs: List[Tuple[float, float, float, float]] = []
-    invalid: List[Tuple[str, str]] = []
-    lines = [line.strip() for line in re.split(r"\n|;", text or "") if line.strip()]
-    for line in lines:
-        parts = re.split(r"[,\s]+", line)
+_EARTH_RADIUS_KM = 6371.0088
+_KM_TO_MI = 0.621371
+_DEG2RAD = math.pi / 180.0
+_ROW_FORMAT = "\n| {:.6f} | {:.6f} | {:.6f} | {:.6f} | {:.2f} | {:.2f} |"
+
+
+_Columns = Tuple[array, array, array, array]
+
+
+_POINT_A_RANGE = "Point A out of range (-90 <= lat <= 90, -180 <= lon <= 180)"
+_POINT_B_RANGE = "Point B out of range (-90 <= lat <= 90, -180 <= lon <= 180)"
+
+
+def _parse_distance_pairs(text: str) -> Tuple[_Columns, List[Tuple[str, str]]]:
+    """Parse pairs into (lat1, lon1, lat2, lon2) float64 column arrays."""
+    lat1s, lon1s, lat2s, lon2s = array("d"), array("d"), array("d"), array("d")
+    # (input index, raw text, reason) so notes keep input order after range checks
+    invalid: List[Tuple[int, str, str]] = []
+    parsed: List[Tuple[int, str]] = []
+    for index, line in enumerate(split_entries(text)):
+        # Inlined `split_tokens`: this loop runs once per input line.
+        parts = line.replace(",", " ").split()
+        if line[0] == "," or line[-1] == ",":
+            parts = split_tokens(line)
         if len(parts) < 4:
-            invalid.append((line, "Expected lat1, lon1, lat2, lon2"))
+            invalid.append((index, line, "Expected lat1, lon1, lat2, lon2"))
             continue
         try:
-            lat1, lon1, lat2, lon2 = map(float, parts[:4])
+            lat1 = float(parts[0])
+            lon1 = float(parts[1])
+            lat2 = float(parts[2])
+            lon2 = float(parts[3])
         except ValueError:
-            invalid.append((line, "Not a number"))
+            invalid.append((index, line, "Not a number"))
             continue
-        if not is_valid_lat_lon(lat1, lon1):
-            invalid.append((line, "Point A out of range (-90 <= lat <= 90, -180 <= lon <= 180)"))
-            continue
-        if not is_valid_lat_lon(lat2, lon2):
-            invalid.append((line, "Point B out of range (-90 <= lat <= 90, -180 <= lon <= 180)"))
-            continue
-        pairs.append((lat1, lon1, lat2, lon2))
-    return pairs, invalid
+        lat1s.append(lat1)
+        lon1s.append(lon1)
+        lat2s.append(lat2)
+        lon2s.append(lon2)
+        parsed.append((index, line))
+    columns, out_of_range = _drop_out_of_range((lat1s, lon1s, lat2s, lon2s), parsed)
+    if out_of_range:
+        invalid = sorted(invalid + out_of_range)
+    return columns, [(raw, reason) for _, raw, reason in invalid]
+
+
+def _drop_out_of_range(columns: _Columns, parsed: List[Tuple[int, str]]):
+    """Split parsed rows into in-range columns and out-of-range notes."""
+    if np is None:
+        kept = (array("d"), array("d"), array("d"), array("d"))
+        out_of_range = []
+        for (index, line), *row in zip(parsed, *columns):
+            if not is_valid_lat_lon(row[0], row[1]):
+                out_of_range.append((index, line, _POINT_A_RANGE))
+            elif not is_valid_lat_lon(row[2], row[3]):
+                out_of_range.append((index, line, _POINT_B_RANGE))
+            else:
+                for col, value in zip(kept, row):
+                    col.append(value)
+        return kept, out_of_range
+    lat1, lon1, lat2, lon2 = (np.frombuffer(col, dtype=np.float64) for col in columns)
+    ok_a = valid_lat_lon_mask(lat1, lon1)
+    valid = ok_a & valid_lat_lon_mask(lat2, lon2)
+    if valid.all():
+        return columns, []
+    out_of_range = [
+        (index, line, _POINT_B_RANGE if a else _POINT_A_RANGE)
+        for (index, line), a, v in zip(parsed, ok_a.tolist(), valid.tolist())
+        if not v
+    ]
+    kept = []
+    for col in (lat1, lon1, lat2, lon2):
+        arr = array("d")
+        arr.frombytes(col[valid].tobytes())
+        kept.append(arr)
+    return tuple(kept), out_of_range
 
 
 def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    radius_km = 6371.0088
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = math.sin(delta_phi / 2.0) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(
-        delta_lambda / 2.0
+    sin = math.sin
+    cos = math.cos
+    sqrt = math.sqrt
+    phi1 = lat1 * _DEG2RAD
+    phi2 = lat2 * _DEG2RAD
+    sin_dphi = sin((phi2 - phi1) * 0.5)
+    sin_dlam = sin((lon2 - lon1) * _DEG2RAD * 0.5)
+    a = sin_dphi * sin_dphi + cos(phi1) * cos(phi2) * sin_dlam * sin_dlam
+    c = 2 * math.atan2(sqrt(a), sqrt(1 - a))
+    return _EARTH_RADIUS_KM * c
+
+
+def _haversine_km_vec(lat1, lon1, lat2, lon2):
+    """Vectorized haversine distance in kilometers for NumPy arrays."""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    delta_phi = phi2 - phi1
+    delta_lambda = np.radians(lon2) - np.radians(lon1)
+    a = np.sin(delta_phi * 0.5) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(
+        delta_lambda * 0.5
     ) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return radius_km * c
+    # Clip guards arcsin against rounding pushing `a` just past 1.0.
+    c = 2.0 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return _EARTH_RADIUS_KM * c
+
+
+def _haversine_km_loop(lat1, lon1, lat2, lon2, out):
+    """Fused haversine loop writing kilometers into ``out``; compiled by Numba."""
+    for i in range(out.shape[0]):
+        phi1 = lat1[i] * _DEG2RAD
+        phi2 = lat2[i] * _DEG2RAD
+        sin_dphi = math.sin((phi2 - phi1) * 0.5)
+        sin_dlam = math.sin((lon2[i] - lon1[i]) * _DEG2RAD * 0.5)
+        a = sin_dphi * sin_dphi + math.cos(phi1) * math.cos(phi2) * sin_dlam * sin_dlam
+        a = min(max(a, 0.0), 1.0)
+        out[i] = _EARTH_RADIUS_KM * 2.0 * math.asin(math.sqrt(a))
+    return out
+
+
+# Importing Numba and loading the cached kernel costs ~0.4 s once per process,
+# against ~15 ms saved per million pairs, so only huge batches take that path.
+_NUMBA_MIN_PAIRS = 1_000_000
+
+
+@lru_cache(maxsize=None)
+def _haversine_km_numba():
+    """Return the compiled kernel, or None when Numba is not installed."""
+    try:
+        from numba import njit
+    except ImportError:  # Numba is optional; stay on the NumPy kernel
+        return None
+    # Serial on purpose: the chat front ends call tools from worker threads, and
+    # parallel kernels launched there hang the threading layer at exit
+    return njit(cache=True, fastmath=True)(_haversine_km_loop)
+
+
+def _distances_km(columns: _Columns) -> Sequence[float]:
+    """Return distances for all pairs using the fastest available kernel."""
+    if np is None:
+        return list(map(_haversine_km, *columns))
+    lat1, lon1, lat2, lon2 = (np.frombuffer(col, dtype=np.float64) for col in columns)
+    kernel = _haversine_km_numba() if lat1.shape[0] >= _NUMBA_MIN_PAIRS else None
+    if kernel is not None:
+        out = np.empty(lat1.shape[0], dtype=np.float64)
+        return kernel(lat1, lon1, lat2, lon2, out).tolist()
+    return _haversine_km_vec(lat1, lon1, lat2, lon2).tolist()
 
 
 def calculate_distance(coordinates: str) -> str:
@@ -54,27 +174,19 @@ def calculate_distance(coordinates: str) -> str:
     Input format: newline or semicolon separated lat1,lon1,lat2,lon2.
     """
 
-    pairs, invalid = _parse_distance_pairs(coordinates)
-    if not pairs:
+    columns, invalid = _parse_distance_pairs(coordinates)
+    if not columns[0]:
         return "No valid coordinate pairs provided." + format_invalid_notes(invalid)
-    lines: List[str] = [
-        "| Point A Lat | Point A Lon | Point B Lat | Point B Lon | Distance (km) | Distance (mi) |",
-        "| --- | --- | --- | --- | --- | --- |",
-    ]
-    for lat1, lon1, lat2, lon2 in pairs:
-        distance_km = _haversine_km(lat1, lon1, lat2, lon2)
-        distance_mi = distance_km * 0.621371
-        lines.append(
-            "| {lat1:.6f} | {lon1:.6f} | {lat2:.6f} | {lon2:.6f} | {km:.2f} | {mi:.2f} |".format(
-                lat1=lat1,
-                lon1=lon1,
-                lat2=lat2,
-                lon2=lon2,
-                km=distance_km,
-                mi=distance_mi,
-            )
-        )
-    return "\n".join(lines) + format_invalid_notes(invalid)
+    buf = io.StringIO()
+    buf.write(
+        "| Point A Lat | Point A Lon | Point B Lat | Point B Lon | Distance (km) | Distance (mi) |\n"
+        "| --- | --- | --- | --- | --- | --- |"
+    )
+    write = buf.write
+    for lat1, lon1, lat2, lon2, km in zip(*columns, _distances_km(columns)):
+        write(_ROW_FORMAT.format(lat1, lon1, lat2, lon2, km, km * _KM_TO_MI))
+    write(format_invalid_notes(invalid))
+    return buf.getvalue()
 
 
 def main() -> None:
@@ -1,115 +1,356 @@
 import json
 import csv
 import io
+import os
+import time
+import warnings
+from array import array
+from functools import lru_cache
+from itertools import starmap
 import xml.etree.ElementTree as ET
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to per-tuple parsing
+    np = None
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml is optional; fall back to xml.etree
+    lxml_etree = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # streaming parser is optional; fall back to json.loads
+    ijson = None
+
+
+_TABLE_HEADER = "| Latitude | Longitude |\n|---------:|----------:|"
+_format_row = "\n| {} | {} |".format
 
 
 def _table(coords):
-    lines = ["| Latitude | Longitude |", "|---------:|----------:|"]
-    for lat, lon in coords:
-        lines.append(f"| {lat} | {lon} |")
-    return "\n".join(lines)
+    return _TABLE_HEADER + "".join(starmap(_format_row, coords))
 
 
-def load_geojson(geojson: str) -> str:
-    """Parse GeoJSON text and return a markdown table of point coordinates."""
-    coords = []
-    try:
-        data = json.loads(geojson)
-    except Exception:
-        return _table(coords)
+_COORDINATE_GEOMETRIES = frozenset(
+    ("MultiPoint", "LineString", "MultiLineString", "Polygon", "MultiPolygon")
+)
+
+
+def _json_loads(text: str):
+    """Parse JSON with orjson when available, otherwise the stdlib ``json``."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN/Infinity literals, which the stdlib accepts
+    return json.loads(text)
+
+
+def _extract_points(obj, coords):
+    """Append (lat, lon) pairs found in a parsed GeoJSON object to ``coords``.
 
-    def extract(obj):
+    Walks the object with an explicit stack; children are pushed in reverse so
+    points come out in document order.
+    """
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
         if isinstance(obj, dict):
-            if obj.get("type") == "Point":
+            kind = obj.get("type")
+            if kind == "Point":
                 c = obj.get("coordinates", [])
                 if len(c) >= 2:
                     lon, lat = c[:2]
                     coords.append((lat, lon))
-            elif obj.get("type") == "FeatureCollection":
-                for f in obj.get("features", []):
-                    extract(f.get("geometry"))
-            elif obj.get("type") == "Feature":
-                extract(obj.get("geometry"))
+            elif kind in _COORDINATE_GEOMETRIES:
+                stack.append(obj.get("coordinates"))
+            elif kind == "GeometryCollection":
+                stack.extend(reversed(obj.get("geometries", [])))
+            elif kind == "FeatureCollection":
+                stack.extend(f.get("geometry") for f in reversed(obj.get("features", [])))
+            elif kind == "Feature":
+                stack.append(obj.get("geometry"))
             else:
-                for v in obj.values():
-                    extract(v)
+                stack.extend(reversed(list(obj.values())))
         elif isinstance(obj, list):
             if len(obj) >= 2 and all(isinstance(n, (int, float)) for n in obj[:2]):
                 lon, lat = obj[:2]
                 coords.append((lat, lon))
             else:
-                for v in obj:
-                    extract(v)
+                stack.extend(reversed(obj))
 
-    extract(data)
-    return _table(coords)
 
+def _stream_feature_collection(data: bytes):
+    """Return coordinates from a FeatureCollection parsed one geometry at a time.
 
-def load_kml(kml: str) -> str:
-    """Parse KML text and return a markdown table of coordinates."""
+    Returns ``None`` when the document is not a FeatureCollection so the caller
+    can fall back to a full parse.
+    """
+    if next(ijson.items(data, "type"), None) != "FeatureCollection":
+        return None
+    coords = []
+    for geometry in ijson.items(data, "features.item.geometry", use_float=True):
+        _extract_points(geometry, coords)
+    return coords
+
+
+def load_geojson(geojson: str) -> str:
+    """Parse GeoJSON text and return a markdown table of point coordinates."""
+    if ijson is not None:
+        try:
+            coords = _stream_feature_collection(geojson.encode("utf-8"))
+        except Exception:
+            # e.g. NaN/Infinity literals, which the full parse below accepts
+            coords = None
+        if coords is not None:
+            return _table(coords)
     coords = []
     try:
-        root = ET.fromstring(kml)
+        data = _json_loads(geojson)
     except Exception:
         return _table(coords)
-    ns = {"k": "http://www.opengis.net/kml/2.2"}
-    for node in root.findall('.//k:coordinates', ns):
-        if node.text:
-            for item in node.text.strip().split():
-                parts = item.split(',')
-                if len(parts) >= 2:
-                    lon, lat = parts[:2]
-                    try:
-                        coords.append((float(lat), float(lon)))
-                    except ValueError:
-                        continue
+    _extract_points(data, coords)
     return _table(coords)
 
 
+def summarize_geojson_file(path: str, sample: int = 3):
+    """Describe a GeoJSON FeatureCollection file without loading it whole.
+
+    Features are streamed one at a time, so memory stays at one feature.
+    Returns a one-paragraph summary (feature count, bounding box and the
+    properties of the first ``sample`` features), or ``None`` when ijson is
+    unavailable or the file is not a strict-JSON FeatureCollection.
+    """
+    if ijson is None:
+        return None
+    count = 0
+    props = []
+    bounds = None
+    with open(path, "rb") as f:
+        try:
+            if next(ijson.items(f, "type"), None) != "FeatureCollection":
+                return None
+            f.seek(0)
+            for feature in ijson.items(f, "features.item", use_float=True):
+                feature = feature or {}
+                count += 1
+                if len(props) < sample:
+                    props.append(feature.get("properties"))
+                coords = []
+                _extract_points(feature.get("geometry"), coords)
+                bounds = _merge_bounds(bounds, coords)
+        except ijson.JSONError:
+            # NaN/Infinity literals or a truncated file; the caller inlines an excerpt
+            return None
+    text = f"GeoJSON FeatureCollection with {count} features"
+    if bounds is not None:
+        text += (
+            f"; bounding box lat {bounds[0]}..{bounds[2]}, lon {bounds[1]}..{bounds[3]}"
+        )
+    if props:
+        text += "; first properties: " + json.dumps(props, default=str)
+    return text
+
+
+def _merge_bounds(bounds, coords):
+    """Extend ``(min_lat, min_lon, max_lat, max_lon)`` with ``(lat, lon)`` pairs."""
+    if not coords:
+        return bounds
+    lats, lons = zip(*coords)
+    box = (min(lats), min(lons), max(lats), max(lons))
+    if bounds is None:
+        return box
+    return (
+        min(bounds[0], box[0]),
+        min(bounds[1], box[1]),
+        max(bounds[2], box[2]),
+        max(bounds[3], box[3]),
+    )
+
+
+def _kml_coordinate_texts(kml: str):
+    """Yield the text of each KML ``coordinates`` element while streaming the document.
+
+    Elements are cleared once handled so memory stays bounded for large exports.
+    """
+    if lxml_etree is not None:
+        yield from _kml_coordinate_texts_lxml(kml)
+        return
+    for _, elem in ET.iterparse(io.StringIO(kml), events=("end",)):
+        if elem.tag.endswith("}coordinates") and elem.text:
+            yield elem.text
+        elem.clear()
+
+
+def _kml_coordinate_texts_lxml(kml: str):
+    """lxml variant of `_kml_coordinate_texts`.
+
+    Only ``coordinates`` and ``Placemark`` events reach Python; each finished
+    placemark is cleared and unlinked from its parent.
+    """
+    context = lxml_etree.iterparse(
+        io.BytesIO(kml.encode("utf-8")),
+        events=("end",),
+        tag=("{*}coordinates", "{*}Placemark"),
+        resolve_entities=False,
+    )
+    for _, elem in context:
+        if elem.tag.endswith("}coordinates"):
+            if elem.text:
+                yield elem.text
+            continue
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def _parse_kml_coordinates(text: str, lats: array, lons: array) -> None:
+    """Append latitudes and longitudes from a KML ``coordinates`` string.
+
+    Uniform ``lon,lat[,alt]`` tuples are parsed in one NumPy call; anything
+    irregular falls back to per-tuple parsing that skips bad entries.
+    """
+    items = text.split()
+    if np is not None and items:
+        width = items[0].count(",") + 1
+        if width in (2, 3) and all(item.count(",") == width - 1 for item in items):
+            try:
+                with warnings.catch_warnings():
+                    # Older NumPy only warns on unparsable data; treat it as an error.
+                    warnings.simplefilter("error", DeprecationWarning)
+                    vals = np.fromstring(text.replace(",", " "), sep=" ")
+            except (ValueError, DeprecationWarning):
+                vals = None
+            if vals is not None and vals.size == width * len(items):
+                lons.frombytes(vals[0::width].tobytes())
+                lats.frombytes(vals[1::width].tobytes())
+                return
+    for item in items:
+        parts = item.split(',')
+        if len(parts) >= 2:
+            try:
+                lon = float(parts[0])
+                lat = float(parts[1])
+            except ValueError:
+                continue
+            lats.append(lat)
+            lons.append(lon)
+
+
+_KML_ERRORS = (ET.ParseError,) if lxml_etree is None else (ET.ParseError, lxml_etree.XMLSyntaxError)
+
+
+def load_kml(kml: str) -> str:
+    """Parse KML text and return a markdown table of coordinates."""
+    # Flat float64 arrays keep large tracks compact (16 bytes per point).
+    lats = array("d")
+    lons = array("d")
+    try:
+        for text in _kml_coordinate_texts(kml):
+            _parse_kml_coordinates(text, lats, lons)
+    except _KML_ERRORS:
+        return _table([])
+    return _table(zip(lats, lons))
+
+
 def load_csv(csv_text: str) -> str:
     """Parse CSV text and return a markdown table of coordinates."""
     coords = []
-    f = io.StringIO(csv_text)
+    reader = csv.reader(io.StringIO(csv_text))
     try:
-        reader = csv.DictReader(f)
-    except Exception:
+        header = next(reader)
+    except (StopIteration, csv.Error):
         return _table(coords)
-    if not reader.fieldnames:
-        return _table(coords)
-    lat_field = None
-    lon_field = None
-    for name in reader.fieldnames:
+    lat_idx = None
+    lon_idx = None
+    for i, name in enumerate(header):
         lname = name.lower()
-        if lname in ("lat", "latitude", "y") and lat_field is None:
-            lat_field = name
-        if lname in ("lon", "lng", "longitude", "x") and lon_field is None:
-            lon_field = name
-    if not lat_field or not lon_field:
+        if lname in ("lat", "latitude", "y") and lat_idx is None:
+            lat_idx = i
+        if lname in ("lon", "lng", "longitude", "x") and lon_idx is None:
+            lon_idx = i
+    if lat_idx is None or lon_idx is None:
         return _table(coords)
+    return _table(_csv_points(reader, lat_idx, lon_idx))
+
+
+def _csv_points(reader, lat_idx: int, lon_idx: int):
+    """Yield (lat, lon) from CSV rows, skipping rows without two numeric values."""
     for row in reader:
         try:
-            lat = float(row[lat_field])
-            lon = float(row[lon_field])
-        except (ValueError, KeyError):
+            yield float(row[lat_idx]), float(row[lon_idx])
+        except (ValueError, IndexError):
             continue
-        coords.append((lat, lon))
-    return _table(coords)
+
+
+# Reused across calls so geoBoundaries lookups keep their TCP/TLS connections alive.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+
+# Boundary tables change rarely; keep them on disk for a day across sessions.
+_BOUNDS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "humboldt", "bounds")
+_BOUNDS_TTL = 24 * 60 * 60
+
+
+def _read_bounds_cache(path: str):
+    """Return a cached boundary table if it exists and has not expired."""
+    try:
+        if time.time() - os.path.getmtime(path) < _BOUNDS_TTL:
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
+
+
+def _write_bounds_cache(path: str, table: str) -> None:
+    try:
+        os.makedirs(_BOUNDS_CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(table)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # caching is best effort
+
+
+@lru_cache(maxsize=64)
+def _boundaries_table(iso: str, adm: str) -> str:
+    """Fetch one boundary table; raises on failure so errors are never cached."""
+    # Only plain codes become file names; anything else skips the disk cache
+    path = None
+    if iso.isalnum() and adm.isalnum():
+        path = os.path.join(_BOUNDS_CACHE_DIR, f"{iso}_{adm}.md")
+        table = _read_bounds_cache(path)
+        if table is not None:
+            return table
+    url = f"https://www.geoboundaries.org/api/current/gbOpen/{iso}/{adm}/"
+    info = _SESSION.get(url, timeout=10)
+    info.raise_for_status()
+    g_url = info.json().get("simplifiedGeometryGeoJSON")
+    if not g_url:
+        raise LookupError(f"no simplified geometry for {iso}/{adm}")
+    geo = _SESSION.get(g_url, timeout=10)
+    geo.raise_for_status()
+    table = load_geojson(geo.text)
+    if path is not None:
+        _write_bounds_cache(path, table)
+    return table
 
 
 def fetch_geo_boundaries(iso: str, adm: str = "ADM0") -> str:
     """Download simplified boundaries from geoBoundaries and return a table."""
-    url = f"https://www.geoboundaries.org/api/current/gbOpen/{iso.upper()}/{adm}/"
     try:
-        info = requests.get(url, timeout=10)
-        info.raise_for_status()
-        data = info.json()
-        g_url = data.get("simplifiedGeometryGeoJSON")
-        if not g_url:
-            return _table([])
-        geo = requests.get(g_url, timeout=10)
-        geo.raise_for_status()
+        return _boundaries_table(iso.upper(), adm)
     except Exception:
         return _table([])
-    return load_geojson(geo.text)
@@ -7,16 +7,178 @@
 import json  # to parse and format JSON for function arguments
 import argparse
 import os
+import sqlite3  # persistent lookup cache
+import threading
+import time
+import atexit  # close pooled connections on shutdown
+from concurrent.futures import ThreadPoolExecutor  # overlap network lookups
+from functools import lru_cache, partial  # memoize repeated lookups
 # Third-party imports
-from openai import OpenAI  # OpenAI client for LLM interaction
 from geopy.geocoders import Nominatim  # Nominatim geocoder for OpenStreetMap
+from geopy.adapters import RequestsAdapter  # keep-alive HTTP session for geopy
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError  # handle geocoding errors
 from geopy.extra.rate_limiter import RateLimiter  # throttle requests
 
-from validation import format_invalid_notes, parse_coordinate_pairs
+from validation import format_invalid_notes, parse_coordinate_pairs, split_entries
+
+# Shared geolocator and rate limiters: one HTTP session for every lookup, and the
+# 1 request/second Nominatim policy is enforced across calls rather than per call.
+# Exceptions are re-raised so failed lookups are never memoized.
+# Private Nominatim instances can raise the request rate via the env vars below.
+NOMINATIM_DOMAIN = os.getenv("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+NOMINATIM_MIN_DELAY = float(os.getenv("NOMINATIM_MIN_DELAY", "1"))
+GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", "1"))
+
+# Pin the requests-based adapter (geopy falls back to urllib, which reconnects per
+# call, when it cannot import requests) and size its pool for concurrent lookups.
+_GEOLOCATOR = Nominatim(
+    user_agent="my_geocoder_app",
+    domain=NOMINATIM_DOMAIN,
+    adapter_factory=partial(RequestsAdapter, pool_maxsize=max(10, GEOCODE_CONCURRENCY)),
+)
+atexit.register(_GEOLOCATOR.adapter.session.close)
+_GEOCODE = RateLimiter(
+    _GEOLOCATOR.geocode, min_delay_seconds=NOMINATIM_MIN_DELAY, swallow_exceptions=False
+)
+_REVERSE = RateLimiter(
+    _GEOLOCATOR.reverse, min_delay_seconds=NOMINATIM_MIN_DELAY, swallow_exceptions=False
+)
+
+# Lookups also persist across sessions in SQLite; set GEOCODE_CACHE_PATH="" to disable.
+GEOCODE_CACHE_PATH = os.getenv(
+    "GEOCODE_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "humboldt", "geocode.sqlite"),
+)
+_DISK_CACHE_TTL = 30 * 24 * 60 * 60
+# "Not found" may be a transient upstream answer; don't pin it for a month
+_DISK_MISS_TTL = 60 * 60
+# Reverse lookups within ~1 m (5 decimal places) share a cache entry
+REVERSE_CACHE_DECIMALS = 5
+_disk_lock = threading.Lock()  # one connection shared by the lookup threads
+_disk_db = None
+
+
+def _disk_cache():
+    global _disk_db
+    if _disk_db is None:
+        os.makedirs(os.path.dirname(GEOCODE_CACHE_PATH) or ".", exist_ok=True)
+        db = sqlite3.connect(GEOCODE_CACHE_PATH, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS lookups "
+            "(provider TEXT, query TEXT, result TEXT, created REAL, PRIMARY KEY (provider, query))"
+        )
+        atexit.register(db.close)
+        _disk_db = db
+    return _disk_db
+
+
+def _disk_get(key):
+    """Return a cached lookup result (a JSON list) or None on miss, expiry or error."""
+    if not GEOCODE_CACHE_PATH:
+        return None
+    try:
+        with _disk_lock:
+            row = _disk_cache().execute(
+                "SELECT result, created FROM lookups WHERE provider = ? AND query = ?",
+                (NOMINATIM_DOMAIN, key),
+            ).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row[0])
+    except (sqlite3.Error, OSError, TypeError, ValueError):
+        return None  # a corrupt row counts as a miss and is overwritten on the next put
+    if not isinstance(result, list) or not result:
+        return None
+    ttl = _DISK_MISS_TTL if result[0] is None else _DISK_CACHE_TTL
+    if time.time() - row[1] > ttl:
+        return None
+    return result
+
+
+def _disk_put(key, result):
+    if not GEOCODE_CACHE_PATH:
+        return
+    try:
+        with _disk_lock:
+            _disk_cache().execute(
+                "INSERT OR REPLACE INTO lookups VALUES (?, ?, ?, ?)",
+                (NOMINATIM_DOMAIN, key, json.dumps(result), time.time()),
+            )
+    except (sqlite3.Error, OSError):
+        pass  # the cache is an optimization; lookups still succeed without it
 
 # Geocoding helper functions
 
+def normalize_query(location_query):
+    """Collapse whitespace and case so equivalent queries share a cache entry."""
+    return " ".join(location_query.split()).casefold()
+
+
+class _NotFound(Exception):
+    """Raised out of the memoized lookups so lru_cache does not keep misses."""
+
+
+# Misses are not memoized: a transient empty answer would otherwise stick for
+# the life of the process; the disk cache still holds them for _DISK_MISS_TTL
+@lru_cache(maxsize=4096)
+def _found_geocode(query, timeout, bounding_box, language):
+    key = json.dumps(["geocode", query, bounding_box, language])
+    result = _disk_get(key)
+    if result is None:
+        location = _GEOCODE(
+            query,
+            timeout=timeout,
+            language=language,
+            viewbox=bounding_box,
+            bounded=bool(bounding_box),
+        )
+        if location:
+            result = location.address, location.latitude, location.longitude
+        else:
+            result = None, None, None
+        _disk_put(key, result)
+    if result[0] is None:
+        raise _NotFound
+    return tuple(result)
+
+
+def _cached_geocode(query, timeout, bounding_box, language):
+    try:
+        return _found_geocode(query, timeout, bounding_box, language)
+    except _NotFound:
+        return None, None, None
+
+
+@lru_cache(maxsize=4096)
+def _found_reverse(pair, timeout, language):
+    key = json.dumps(["reverse", pair, language])
+    result = _disk_get(key)
+    if result is None:
+        location = _REVERSE(pair, language=language, timeout=timeout)
+        result = [location.address if location else None]
+        _disk_put(key, result)
+    if result[0] is None:
+        raise _NotFound
+    return result[0]
+
+
+def _cached_reverse(pair, timeout, language):
+    try:
+        return _found_reverse(pair, timeout, language)
+    except _NotFound:
+        return None
+
+
+def _map_concurrent(fn, items, concurrency):
+    """Apply ``fn`` to ``items`` in order, using a thread pool when ``concurrency > 1``."""
+    if concurrency <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as executor:
+        return list(executor.map(fn, items))
+
+
 def get_coordinates(location_query, *, timeout=1, bounding_box=None, language="en"):
     """Query Nominatim for a single location string.
 
@@ -35,20 +197,14 @@ def get_coordinates(location_query, *, timeout=1, bounding_box=None, language="e
     -------
     tuple
         (matched address, latitude, longitude) if found otherwise ``(None, None, None)``.
+
+    Successful lookups are cached per normalized query. Confirmed misses are
+    kept only in the disk cache, for an hour; errors and timeouts are not cached.
     """
-    geolocator = Nominatim(user_agent="my_geocoder_app", timeout=timeout)
-    geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1)
+    if bounding_box is not None:
+        bounding_box = tuple(bounding_box)
     try:
-        location = geocode(
-            location_query,
-            language=language,
-            viewbox=bounding_box,
-            bounded=bool(bounding_box),
-        )
-        if location:
-            return location.address, location.latitude, location.longitude
-        else:
-            return None, None, None
+        return _cached_geocode(normalize_query(location_query), timeout, bounding_box, language)
     except (GeocoderTimedOut, GeocoderServiceError, Exception):
         # Return empty tuple on any geocoding failure
         return None, None, None
@@ -58,11 +214,12 @@ def parse_locations(locations_str):
     """
     Split a string of locations (newline or semicolon delimited) into a list.
     """
-    import re
-    return [line.strip() for line in re.split(r'\n|;', locations_str) if line.strip()]
+    return split_entries(locations_str)
 
 
-def reverse_geocode_coordinates(coordinates_str: str, *, timeout=1, language="en") -> str:
+def reverse_geocode_coordinates(
+    coordinates_str: str, *, timeout=1, language="en", concurrency=None
+) -> str:
     """Reverse geocode lat/lon pairs to the nearest address.
 
     Parameters
@@ -73,18 +230,28 @@ def reverse_geocode_coordinates(coordinates_str: str, *, timeout=1, language="en
         Request timeout in seconds (default 1).
     language : str, optional
         Preferred language for address results (default ``"en"``).
+    concurrency : int, optional
+        Number of lookups to run in parallel (default ``GEOCODE_CONCURRENCY``).
+
+    Addresses are cached per coordinate pair like forward lookups, with
+    pairs rounded to ``REVERSE_CACHE_DECIMALS`` places so near-identical
+    points share an entry.
     """
     pairs, invalid_entries = parse_coordinate_pairs(coordinates_str)
-    geolocator = Nominatim(user_agent="my_geocoder_app", timeout=timeout)
-    reverse = RateLimiter(geolocator.reverse, min_delay_seconds=1)
-    rows = []
-    for lat, lon in pairs:
+
+    def lookup(key):
         try:
-            location = reverse((lat, lon), language=language)
-            address = location.address if location else "Not found"
+            return _cached_reverse(key, timeout, language) or "Not found"
         except (GeocoderTimedOut, GeocoderServiceError, Exception):
-            address = "Not found"
-        rows.append((lat, lon, address))
+            return "Not found"
+
+    keys = [tuple(round(value, REVERSE_CACHE_DECIMALS) for value in pair) for pair in pairs]
+    # Look up each distinct point once, even when threads would race on the cache
+    unique = list(dict.fromkeys(keys))
+    looked_up = _map_concurrent(lookup, unique, concurrency or GEOCODE_CONCURRENCY)
+    found = dict(zip(unique, looked_up))
+    addresses = [found[key] for key in keys]
+    rows = [(lat, lon, address) for (lat, lon), address in zip(pairs, addresses)]
     table = [
         "| Latitude | Longitude | Address |",
         "|---------:|----------:|---------|",
@@ -96,14 +263,21 @@ def reverse_geocode_coordinates(coordinates_str: str, *, timeout=1, language="en
     return "\n".join(table) + format_invalid_notes(invalid_entries)
 
 
-def geocode_locations(locations_str: str) -> str:
+def geocode_locations(locations_str: str, *, concurrency=None) -> str:
     """
     Geocode multiple locations and return a markdown-formatted table.
+
+    ``concurrency`` sets how many lookups run in parallel (default
+    ``GEOCODE_CONCURRENCY``); the shared rate limiter still spaces out requests.
     """
     locations = parse_locations(locations_str)
+    # Look up each distinct input once, even when threads would race on the cache
+    unique = list(dict.fromkeys(locations))
+    looked_up = _map_concurrent(get_coordinates, unique, concurrency or GEOCODE_CONCURRENCY)
+    found = dict(zip(unique, looked_up))
+    results = [found[loc] for loc in locations]
     rows = []
-    for loc in locations:
-        address, lat, lon = get_coordinates(loc)
+    for loc, (address, lat, lon) in zip(locations, results):
         # Use placeholders on missing data
         address = address or "Not found"
         lat = lat or ""
@@ -143,6 +317,9 @@ def main():
     )
     args = parser.parse_args()
 
+    # Imported here so library users and --help skip the OpenAI SDK import
+    from openai import OpenAI  # OpenAI client for LLM interaction
+
     client = OpenAI(base_url=args.base_url, api_key=args.api_key)
 
     # Prompt the user for location input
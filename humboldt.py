@@ -3,90 +3,237 @@
 > pip install openai
 """
 
+import asyncio
 import json
 import argparse
 import os
 import logging
 import subprocess
 import sys
-import importlib.util
-from typing import Any, Dict, Optional
+import importlib.metadata
+import re
+from typing import Any, Dict, List, Optional
+
+from humboldt_core import (
+    DIRECT_RETURN_TOOLS,
+    FUNCTIONS,
+    LOADER_FUNCTIONS,
+    SYSTEM_PROMPT,
+    TABLE_SHOWN,
+    async_http_client,
+    clip_table,
+    compact_history,
+)
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    orjson = None
+
+
+def _normalize_name(name: str) -> str:
+    """Normalize a distribution name the way pip compares them (PEP 503)."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _installed_distributions() -> set:
+    """Return normalized names of every installed distribution."""
+    return {
+        _normalize_name(d.metadata.get("Name"))
+        for d in importlib.metadata.distributions()
+        if d.metadata.get("Name")
+    }
 
 
 def check_and_install_dependencies():
     """Check if required dependencies are installed and install them if missing."""
-    print("Checking dependencies...")
-
     requirements_file = "requirements.txt"
     if not os.path.exists(requirements_file):
         print(f"Warning: {requirements_file} not found. Assuming dependencies are installed.")
         return
 
-    missing_packages = []
-
     with open(requirements_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                # Extract package name (remove version specifiers)
-                package_name = line.split('>=')[0].split('==')[0].split('<')[0].split('>')[0]
-                if not is_package_installed(package_name):
-                    missing_packages.append(line)
+        requirements = f.read()
+
+    print("Checking dependencies...")
+    # One metadata scan (tens of ms) instead of importing each package; it runs
+    # every start so uninstalled packages and interpreter changes are noticed
+    installed = _installed_distributions()
+    missing_packages = []
+    for line in requirements.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            # Extract package name (remove version specifiers)
+            package_name = re.split(r"[<>=!~;\[ ]", line, maxsplit=1)[0]
+            if _normalize_name(package_name) not in installed:
+                missing_packages.append(line)
 
     if missing_packages:
         print(f"Missing packages found: {', '.join(missing_packages)}")
         print("Installing missing dependencies...")
 
-        for package in missing_packages:
+        # One pip invocation for everything; pip startup dominates per-package installs
+        pip = [sys.executable, "-m", "pip", "install"]
+        try:
+            # Prefer --user for managed environments
+            subprocess.run(pip + ["--user", *missing_packages],
+                           check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            print("✗ Failed to install with --user flag")
             try:
-                print(f"Installing {package}...")
-                # Prefer --user for managed environments
-                subprocess.run([sys.executable, "-m", "pip", "install", "--user", package],
+                print("Trying alternative installation...")
+                subprocess.run(pip + ["--break-system-packages", *missing_packages],
                                check=True, capture_output=True, text=True)
-                print(f"✓ Successfully installed {package}")
-            except subprocess.CalledProcessError as e:
-                print(f"✗ Failed to install {package} with --user flag")
-                try:
-                    print(f"Trying alternative installation for {package}...")
-                    subprocess.run([sys.executable, "-m", "pip", "install", "--break-system-packages", package],
-                                   check=True, capture_output=True, text=True)
-                    print(f"✓ Successfully installed {package}")
-                except subprocess.CalledProcessError as e2:
-                    if e.stderr:
-                        print(f"Error details: {e.stderr}")
-                    if e.stdout:
-                        print(f"Output: {e.stdout}")
-                    print("\nAutomatic installation failed. Please install dependencies manually:")
-                    print("Option 1: pip install --user -r requirements.txt")
-                    print("Option 2: pip install --break-system-packages -r requirements.txt")
-                    print("Option 3: Create a virtual environment:")
-                    print("  python3 -m venv venv")
-                    print("  source venv/bin/activate")
-                    print("  pip install -r requirements.txt")
-                    sys.exit(1)
-
+            except subprocess.CalledProcessError:
+                if e.stderr:
+                    print(f"Error details: {e.stderr}")
+                if e.stdout:
+                    print(f"Output: {e.stdout}")
+                print("\nAutomatic installation failed. Please install dependencies manually:")
+                print("Option 1: pip install --user -r requirements.txt")
+                print("Option 2: pip install --break-system-packages -r requirements.txt")
+                print("Option 3: Create a virtual environment:")
+                print("  python3 -m venv venv")
+                print("  source venv/bin/activate")
+                print("  pip install -r requirements.txt")
+                sys.exit(1)
+        print(f"✓ Successfully installed {', '.join(missing_packages)}")
         print("All dependencies installed successfully!")
     else:
         print("All dependencies are already installed.")
 
 
-def is_package_installed(package_name):
-    """Check if a package is installed."""
-    package_mapping = {
-        'openai': 'openai',
-        'geopy': 'geopy'
+PLANNER_PROMPT = (
+    "Plan the tool calls needed to answer the user's last message. Reply with "
+    "ONLY a JSON array; each item is {\"id\": int, \"name\": tool name, "
+    "\"args\": object, \"deps\": [ids that must finish first]}. To pass a "
+    "call's output to a later call, write \"$<id>\" inside that call's argument "
+    "string. Calls that do not depend on each other must have empty deps so they "
+    "can run in parallel. Reply with [] if no tool is needed. Available tools:\n"
+)
+
+# "$3" inside a planned call's string argument stands for call 3's output
+_PLAN_REF_RE = re.compile(r"\$(\d+)")
+
+
+def _plan_refs(args: Dict[str, Any]) -> set:
+    """Return the call ids referenced as ``$<id>`` in a call's string arguments."""
+    return {
+        int(ref)
+        for value in args.values()
+        if isinstance(value, str)
+        for ref in _PLAN_REF_RE.findall(value)
     }
-    check_name = package_mapping.get(package_name, package_name)
+
+
+def parse_plan(text: Optional[str], known_tools) -> Optional[List[Dict[str, Any]]]:
+    """Validate planner output; return the call list or None if unusable.
+
+    References (``$<id>``) are added to a call's deps. Plans with unknown tools,
+    duplicate ids, deps or references to missing ids, or a dependency cycle are
+    rejected, and the caller falls back to the step-by-step tool loop.
+    """
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`").split("\n", 1)[-1]
     try:
-        spec = importlib.util.find_spec(check_name)
-        return spec is not None
-    except (ImportError, ValueError, ModuleNotFoundError):
-        return False
+        plan = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(plan, list) or not plan:
+        return None
+    ids = set()
+    for node in plan:
+        if not isinstance(node, dict) or node.get("name") not in known_tools:
+            return None
+        if not isinstance(node.get("args", {}), dict) or node.get("id") in ids:
+            return None
+        ids.add(node.get("id"))
+    for node in plan:
+        deps = node.get("deps", [])
+        if not isinstance(deps, list):
+            return None
+        deps = set(deps) | _plan_refs(node.get("args", {}))
+        if not deps <= ids or node.get("id") in deps:
+            return None
+        node["deps"] = sorted(deps)
+    # Reject cycles up front: they would leave calls that can never run
+    done: set = set()
+    pending = list(plan)
+    while pending:
+        ready = [n for n in pending if set(n["deps"]) <= done]
+        if not ready:
+            return None
+        done.update(n.get("id") for n in ready)
+        pending = [n for n in pending if n not in ready]
+    return plan
+
+
+def _resolve_args(args: Dict[str, Any], results: Dict[Any, Optional[str]]) -> Dict[str, Any]:
+    """Substitute ``$<id>`` references in string arguments with those calls' outputs."""
+    return {
+        key: _PLAN_REF_RE.sub(lambda m: results.get(int(m.group(1))) or "", value)
+        if isinstance(value, str)
+        else value
+        for key, value in args.items()
+    }
+
+
+async def execute_plan(plan: List[Dict[str, Any]], run_tool) -> List[Optional[str]]:
+    """Run planned calls wave by wave; calls whose deps are done run concurrently.
+
+    ``run_tool(name, args)`` is blocking and is dispatched to worker threads.
+    Each call's ``$<id>`` references are filled in from earlier outputs, and the
+    resolved arguments are stored back in the node so the transcript shows
+    what ran. Results are returned in plan order; calls stuck behind a
+    dependency cycle (which `parse_plan` rejects) are never run and yield ``None``.
+    """
+    results: Dict[Any, Optional[str]] = {}
+    pending = list(plan)
+    while pending:
+        ready = [n for n in pending if all(d in results for d in n.get("deps", []))]
+        if not ready:
+            break
+        for node in ready:
+            node["args"] = _resolve_args(node.get("args", {}), results)
+        outputs = await asyncio.gather(
+            *(asyncio.to_thread(run_tool, n["name"], n["args"]) for n in ready)
+        )
+        for node, output in zip(ready, outputs):
+            results[node.get("id")] = output
+        pending = [n for n in pending if n not in ready]
+    return [results.get(n.get("id")) for n in plan]
 
 
 # Import modules that are definitely available; others imported after deps
 
-def main():
+# Direct tool shortcuts: "/<cmd> <payload>" bypasses the LLM
+_SLASH_RE = re.compile(
+    r"^/(?P<cmd>geocode|reverse|dms|distance|geojson|kml|csv|bounds)\s+(?P<payload>.*)$",
+    re.DOTALL,
+)
+SLASH_MAP = {
+    "geocode": ("geocode_locations", "locations"),
+    "reverse": ("reverse_geocode_coordinates", "coordinates"),
+    "dms": ("convert_dd_to_dms", "coordinates"),
+    "distance": ("calculate_distance", "coordinates"),
+    "geojson": ("load_geojson", "geojson"),
+    "kml": ("load_kml", "kml"),
+    "csv": ("load_csv", "csv"),
+    "bounds": ("fetch_geo_boundaries", "iso"),
+}
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    """Read a boolean environment variable ("1"/"true" or "0"/"false")."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value in ("1", "true", "True")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the command-line parser; environment defaults are read once here."""
     parser = argparse.ArgumentParser(description="Interactive GeoAI agent")
     parser.add_argument(
         "--base-url",
@@ -118,20 +265,53 @@ def main():
         default=int(os.getenv("HUMBOLDT_MAX_STEPS", 3)),
         help="Max consecutive tool calls before stopping (default: 3)",
     )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        default=_env_flag("HUMBOLDT_PLAN", False),
+        help="Plan independent tool calls up front and run them in parallel",
+    )
+    parser.add_argument(
+        "--no-warmup",
+        action="store_true",
+        default=not _env_flag("HUMBOLDT_WARMUP", True),
+        help="Skip the one-token request that opens the API connection at startup",
+    )
+    parser.add_argument(
+        "--no-direct-tools",
+        action="store_true",
+        default=not _env_flag("HUMBOLDT_DIRECT_TOOL", True),
+        help="Have the model restate geocode/DMS/reverse tables instead of printing them directly",
+    )
+    parser.add_argument(
+        "--gzip-requests",
+        action="store_true",
+        default=_env_flag("HUMBOLDT_GZIP_REQUESTS", False),
+        help="Gzip request bodies (the API server must accept Content-Encoding: gzip)",
+    )
     parser.add_argument(
         "--debug",
         action="store_true",
-        default=os.getenv("HUMBOLDT_DEBUG", "0") in ("1", "true", "True"),
+        default=_env_flag("HUMBOLDT_DEBUG", False),
         help="Enable debug logging",
     )
-    args = parser.parse_args()
+    return parser
+
+
+# Built at import so startup and --help do no extra work in main()
+_PARSER = _build_parser()
+
+
+async def main():
+    args = _PARSER.parse_args()
 
     if not args.skip_deps:
         check_and_install_dependencies()
 
     # Import modules after dependency checking
     try:
-        from openai import OpenAI
+        from openai import AsyncOpenAI
+        from chat_cache import ChatCache
         from geocode import geocode_locations, reverse_geocode_coordinates
         from dd2dms import convert_dd_to_dms
         from distance import calculate_distance
@@ -151,140 +331,119 @@ def main():
         print("pip install -r requirements.txt")
         sys.exit(1)
 
-    client = OpenAI(base_url=args.base_url, api_key=args.api_key)
+    client = AsyncOpenAI(
+        base_url=args.base_url,
+        api_key=args.api_key,
+        http_client=async_http_client(gzip_requests=args.gzip_requests),
+    )
+    response_cache = ChatCache()
+
+    def request_key(**request) -> str:
+        # Hash the pre-serialized schemas instead of re-encoding them every turn
+        if request.get("extra_body") is tool_body:
+            request["extra_body"] = functions_json
+        return response_cache.key(**request)
+
+    async def complete(**request):
+        """Call the chat API, serving exact repeats from the response cache."""
+        key = request_key(**request)
+        response = response_cache.get(key)
+        if response is None:
+            response = await client.chat.completions.create(**request)
+            response_cache.put(key, response)
+        elif args.debug:
+            print("[DEBUG] Response cache hit")
+        return response
+
+    async def stream_reply(**request):
+        """Stream a completion, echoing content tokens as they arrive.
+
+        Returns ``(content, function_call)`` where ``function_call`` is a
+        ``{"name", "arguments"}`` dict assembled from the deltas, or None.
+        """
+        key = request_key(stream=True, **request)
+        cached = response_cache.get(key)
+        if cached is not None:
+            if args.debug:
+                print("[DEBUG] Response cache hit")
+            if cached[0]:
+                print(cached[0])
+            return cached
+        parts: List[str] = []
+        name = ""
+        arguments: List[str] = []
+        stream = await client.chat.completions.create(stream=True, **request)
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                sys.stdout.write(delta.content)
+                sys.stdout.flush()
+                parts.append(delta.content)
+            if delta.function_call:
+                if delta.function_call.name and not name:
+                    name = delta.function_call.name
+                arguments.append(delta.function_call.arguments or "")
+        content = "".join(parts)
+        if content:
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+        result = (content, {"name": name, "arguments": "".join(arguments)} if name else None)
+        response_cache.put(key, result)
+        return result
+
+    async def summarize(prompt: str) -> Optional[str]:
+        """Condense evicted turns for `compact_history`; None if the call fails."""
+        try:
+            response = await complete(
+                model=args.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=300,
+            )
+        except Exception as e:
+            # Without a summary the old turns are simply dropped
+            print(f"[ERROR] History summary failed: {e}")
+            return None
+        summary = response.choices[0].message.content
+        if args.debug:
+            print("[DEBUG] History summary:", summary)
+        return summary
+
+    # Line editing via prompt_toolkit when available on a real terminal
+    prompt_session = None
+    if sys.stdin.isatty():
+        try:
+            from prompt_toolkit import PromptSession
+            prompt_session = PromptSession()
+        except ImportError:
+            pass
+
+    async def read_line(prompt: str) -> Optional[str]:
+        """Read one line of user input; returns None at end of input."""
+        if prompt_session is not None:
+            try:
+                return await prompt_session.prompt_async(prompt)
+            except EOFError:
+                return None
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        # Read input off the event loop so pending network work is not blocked
+        line = await asyncio.to_thread(sys.stdin.readline)
+        return line.rstrip("\r\n") if line else None
 
     logging.basicConfig(
         level=logging.DEBUG if args.debug else logging.INFO,
         format="%(levelname)s: %(message)s",
     )
 
-    system_prompt = (
-        "You are a GeoAI Agent who is an expert GIS and Remote Sensing Analyst, "
-        "cartographer, and Geospatial Developer. Your name is Humboldt, in honor "
-        "of Alexander von Humboldt, the father of Modern Geography. You must "
-        "always use the provided function tools to perform geospatial tasks and "
-        "never guess results. When you invoke a tool it will be logged for the "
-        "user to see. If the user requests a map marker or location to be shown, "
-        "call `geocode_locations` first so the interface can display the point. "
-        "Do not claim you are unable to manipulate maps or geospatial data; use "
-        "the provided tools and let the interface handle map updates."
-    )
-
-    messages = [{"role": "system", "content": system_prompt}]
-    functions = [
-        {
-            "name": "geocode_locations",
-            "description": "Geocode a list of locations and return a markdown table",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "locations": {
-                        "type": "string",
-                        "description": "Newline- or semicolon-delimited list of locations to geocode",
-                    }
-                },
-                "required": ["locations"],
-            },
-        },
-        {
-            "name": "convert_dd_to_dms",
-            "description": "Convert decimal-degree coordinates to DMS table",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "coordinates": {
-                        "type": "string",
-                        "description": "Newline- or semicolon-delimited DD lat,lon pairs",
-                    }
-                },
-                "required": ["coordinates"],
-            },
-        },
-        {
-            "name": "reverse_geocode_coordinates",
-            "description": "Reverse geocode lat/lon pairs to addresses",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "coordinates": {
-                        "type": "string",
-                        "description": "Newline- or semicolon-delimited DD lat,lon pairs",
-                    }
-                },
-                "required": ["coordinates"],
-            },
-        },
-        {
-            "name": "calculate_distance",
-            "description": "Calculate great-circle distance between coordinate pairs",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "coordinates": {
-                        "type": "string",
-                        "description": "Newline- or semicolon-delimited lat1,lon1,lat2,lon2 pairs",
-                    }
-                },
-                "required": ["coordinates"],
-            },
-        },
-    ]
-
-    if 'loaders_available' in locals() and loaders_available:
-        functions.extend([
-            {
-                "name": "load_geojson",
-                "description": "Load GeoJSON text and return a coordinate table",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "geojson": {
-                            "type": "string",
-                            "description": "Contents of a GeoJSON file",
-                        }
-                    },
-                    "required": ["geojson"],
-                },
-            },
-            {
-                "name": "load_kml",
-                "description": "Load KML text and return a coordinate table",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "kml": {"type": "string", "description": "Contents of a KML file"}
-                    },
-                    "required": ["kml"],
-                },
-            },
-            {
-                "name": "load_csv",
-                "description": "Load CSV text with latitude/longitude columns",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "csv": {"type": "string", "description": "Contents of a CSV file"}
-                    },
-                    "required": ["csv"],
-                },
-            },
-            {
-                "name": "fetch_geo_boundaries",
-                "description": "Download simplified political boundaries from geoBoundaries",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "iso": {"type": "string", "description": "ISO 3166-1 alpha-3 code"},
-                        "adm": {
-                            "type": "string",
-                            "description": "Administrative level",
-                            "default": "ADM0",
-                        },
-                    },
-                    "required": ["iso"],
-                },
-            },
-        ])
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    functions = list(FUNCTIONS + LOADER_FUNCTIONS) if loaders_available else list(FUNCTIONS)
+    # Serialized once; the schemas are fixed for the whole session
+    functions_json = json.dumps(functions)
+    # Sent through extra_body, which the SDK merges into the request as-is;
+    # as a typed argument it would re-walk the static schemas on every call
+    tool_body = {"functions": functions}
 
     # Tool registry
     def tool_geocode_locations(arguments: Dict[str, Any]) -> str:
@@ -306,7 +465,7 @@ def main():
         "calculate_distance": tool_calculate_distance,
     }
 
-    if 'loaders_available' in locals() and loaders_available:
+    if loaders_available:
         def tool_load_geojson(arguments: Dict[str, Any]) -> str:
             return load_geojson(arguments.get("geojson", ""))
 
@@ -327,6 +486,12 @@ def main():
         })
 
     def safe_json_loads(s: str) -> Optional[Dict[str, Any]]:
+        # Tool arguments can carry whole GeoJSON/KML documents; orjson parses them faster
+        if orjson is not None:
+            try:
+                return orjson.loads(s or "{}")
+            except orjson.JSONDecodeError:
+                pass  # e.g. NaN/Infinity literals, which the stdlib accepts
         try:
             return json.loads(s or "{}")
         except Exception:
@@ -355,6 +520,24 @@ def main():
             print(f"[ERROR] Tool '{tool_name}' failed: {e}")
             return None
 
+    planner_prompt = PLANNER_PROMPT + functions_json
+
+    async def warmup():
+        # Open the connection (and let the server cache the system prompt)
+        # while the user reads the greeting and types the first message
+        try:
+            await client.chat.completions.create(
+                model=args.model,
+                messages=messages[:1],
+                extra_body=tool_body,
+                max_tokens=1,
+            )
+        except Exception as e:
+            if args.debug:
+                print(f"[DEBUG] Warmup request failed: {e}")
+
+    warmup_task = None if args.no_warmup else asyncio.create_task(warmup())
+
     # Greet the user
     print("Hi, I'm Humboldt, your GeoAI Agent. How can I assist you today?")
     if args.debug:
@@ -362,59 +545,99 @@ def main():
 
     # REPL loop
     while True:
-        user_input = input("Humboldt> (type 'exit' to quit)\n")
-        if user_input.lower() in ("exit", "quit"):
+        user_input = await read_line("Humboldt> (type 'exit' to quit)\n")
+        if user_input is None or user_input.lower() in ("exit", "quit"):
             print("Exiting Humboldt. Goodbye!")
             break
 
         # Direct tool invocations
-        if user_input.startswith("/geocode "):
-            payload = user_input[len("/geocode "):]
-            print(tool_geocode_locations({"locations": payload}))
-            continue
-        if user_input.startswith("/reverse "):
-            payload = user_input[len("/reverse "):]
-            print(tool_reverse_geocode_coordinates({"coordinates": payload}))
-            continue
-        if user_input.startswith("/dms "):
-            payload = user_input[len("/dms "):]
-            print(tool_convert_dd_to_dms({"coordinates": payload}))
-            continue
-        if user_input.startswith("/distance "):
-            payload = user_input[len("/distance "):]
-            print(tool_calculate_distance({"coordinates": payload}))
+        slash = _SLASH_RE.match(user_input)
+        if slash:
+            tool_name, arg_key = SLASH_MAP[slash["cmd"]]
+            tool = tool_registry.get(tool_name)
+            if tool is None:
+                print(f"/{slash['cmd']} is unavailable: file loaders failed to import.")
+            else:
+                print(tool({arg_key: slash["payload"]}))
             continue
 
         messages.append({"role": "user", "content": user_input})
         if args.debug:
             print("[DEBUG] Sending to LLM (last 2 msgs):", messages[-2:])
 
+        # Planner path: one LLM call returns a DAG of tool calls, independent
+        # calls run concurrently, then a single completion answers the user.
+        if args.plan:
+            plan_response = await complete(
+                model=args.model,
+                messages=messages + [{"role": "system", "content": planner_prompt}],
+                max_tokens=1000,
+            )
+            plan = parse_plan(plan_response.choices[0].message.content, tool_registry)
+            if args.debug:
+                print("[DEBUG] Tool plan:", plan if plan else "unusable; using the tool loop")
+            if plan:
+                outputs = await execute_plan(plan, run_tool_call)
+                for node, output in zip(plan, outputs):
+                    call = {"name": node["name"], "arguments": json.dumps(node.get("args", {}))}
+                    messages.append({"role": "assistant", "content": None, "function_call": call})
+                    messages.append({"role": "function", "name": node["name"], "content": clip_table(output or "")})
+                if not args.no_direct_tools and all(outputs) and all(
+                    node["name"] in DIRECT_RETURN_TOOLS for node in plan
+                ):
+                    print("\n\n".join(outputs))
+                    messages.append({"role": "assistant", "content": TABLE_SHOWN})
+                else:
+                    for output in outputs:
+                        if output and clip_table(output) != output:
+                            # The model only sees the first rows; show the user the whole table
+                            print(output)
+                    reply, _ = await stream_reply(
+                        model=args.model,
+                        messages=messages,
+                        max_tokens=1000,
+                        frequency_penalty=1,
+                    )
+                    if reply:
+                        messages.append({"role": "assistant", "content": reply})
+                messages = await compact_history(messages, summarize)
+                continue
+
         # Multi-step tool loop
         steps = 0
         last_content_printed = False
         while steps <= args.max_steps:
-            response = client.chat.completions.create(
+            content, call = await stream_reply(
                 model=args.model,
                 messages=messages,
-                functions=functions,
+                extra_body=tool_body,
                 function_call="auto",
                 max_tokens=1000,
                 frequency_penalty=1,
             )
-            message = response.choices[0].message
             if args.debug:
-                print("[DEBUG] LLM message:", message)
+                print("[DEBUG] LLM message:", {"content": content, "function_call": call})
 
-            if getattr(message, "function_call", None):
-                call = message.function_call
-                tool_output = run_tool_call(call.name, call.arguments)
+            if call:
+                # Tools do blocking HTTP (geocoders, geoBoundaries); run them in a worker thread
+                tool_output = await asyncio.to_thread(run_tool_call, call["name"], call["arguments"])
+                clipped = clip_table(tool_output or "")
                 messages.append({"role": "assistant", "content": None, "function_call": call})
-                messages.append({"role": "function", "name": call.name, "content": tool_output or ""})
+                messages.append({"role": "function", "name": call["name"], "content": clipped})
                 steps += 1
+                if tool_output and not args.no_direct_tools and call["name"] in DIRECT_RETURN_TOOLS:
+                    # The table is the answer; skip the completion that would repeat it
+                    print(tool_output)
+                    messages.append({"role": "assistant", "content": TABLE_SHOWN})
+                    last_content_printed = True
+                    break
+                if clipped != (tool_output or ""):
+                    # The model only sees the first rows; show the user the whole table
+                    print(tool_output)
                 continue
 
-            if message.content:
-                print(message.content)
+            if content:
+                messages.append({"role": "assistant", "content": content})
                 last_content_printed = True
                 break
 
@@ -423,9 +646,8 @@ def main():
         if steps > args.max_steps and not last_content_printed:
             print("[INFO] Reached maximum tool-call steps. Stopping.")
 
-        if len(messages) > 20:
-            messages = [messages[0]] + messages[-19:]
+        messages = await compact_history(messages, summarize)
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
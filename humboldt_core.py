@@ -0,0 +1,345 @@
+"""Prompt, tool schemas, history compaction and API client setup shared by the
+Humboldt REPL and the web chat.
+
+Standard library only at import time; the OpenAI SDK and httpx are imported
+when a client is built, so importing this module stays cheap.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+SYSTEM_PROMPT = (
+    "You are a GeoAI Agent who is an expert GIS and Remote Sensing Analyst, "
+    "cartographer, and Geospatial Developer. Your name is Humboldt, in honor "
+    "of Alexander von Humboldt, the father of Modern Geography. You must "
+    "always use the provided function tools to perform geospatial tasks and "
+    "never guess results. When you invoke a tool it will be logged for the "
+    "user to see. If the user requests a map marker or location to be shown, "
+    "call `geocode_locations` first so the interface can display the point. "
+    "Do not claim you are unable to manipulate maps or geospatial data; use "
+    "the provided tools and let the interface handle map updates."
+)
+
+FUNCTIONS: Tuple[Dict[str, Any], ...] = (
+    {
+        "name": "geocode_locations",
+        "description": "Geocode a list of locations and return a markdown table",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "locations": {
+                    "type": "string",
+                    "description": "Newline- or semicolon-delimited list of locations to geocode",
+                }
+            },
+            "required": ["locations"],
+        },
+    },
+    {
+        "name": "convert_dd_to_dms",
+        "description": "Convert decimal-degree coordinates to DMS table",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "coordinates": {
+                    "type": "string",
+                    "description": "Newline- or semicolon-delimited DD lat,lon pairs",
+                }
+            },
+            "required": ["coordinates"],
+        },
+    },
+    {
+        "name": "reverse_geocode_coordinates",
+        "description": "Reverse geocode lat/lon pairs to addresses",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "coordinates": {
+                    "type": "string",
+                    "description": "Newline- or semicolon-delimited DD lat,lon pairs",
+                }
+            },
+            "required": ["coordinates"],
+        },
+    },
+    {
+        "name": "calculate_distance",
+        "description": "Calculate great-circle distance between coordinate pairs",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "coordinates": {
+                    "type": "string",
+                    "description": "Newline- or semicolon-delimited lat1,lon1,lat2,lon2 pairs",
+                }
+            },
+            "required": ["coordinates"],
+        },
+    },
+)
+
+# Schemas for the file loaders, offered only when file_loaders imports cleanly
+LOADER_FUNCTIONS: Tuple[Dict[str, Any], ...] = (
+    {
+        "name": "load_geojson",
+        "description": "Load GeoJSON text and return a coordinate table",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "geojson": {
+                    "type": "string",
+                    "description": "Contents of a GeoJSON file",
+                }
+            },
+            "required": ["geojson"],
+        },
+    },
+    {
+        "name": "load_kml",
+        "description": "Load KML text and return a coordinate table",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "kml": {"type": "string", "description": "Contents of a KML file"}
+            },
+            "required": ["kml"],
+        },
+    },
+    {
+        "name": "load_csv",
+        "description": "Load CSV text with latitude/longitude columns",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "csv": {"type": "string", "description": "Contents of a CSV file"}
+            },
+            "required": ["csv"],
+        },
+    },
+    {
+        "name": "fetch_geo_boundaries",
+        "description": "Download simplified political boundaries from geoBoundaries",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "iso": {"type": "string", "description": "ISO 3166-1 alpha-3 code"},
+                "adm": {
+                    "type": "string",
+                    "description": "Administrative level",
+                    "default": "ADM0",
+                },
+            },
+            "required": ["iso"],
+        },
+    },
+)
+
+# Tools whose markdown table is already the user-facing answer, so the
+# follow-up completion that would restate it can be skipped.
+DIRECT_RETURN_TOOLS = frozenset(
+    {"geocode_locations", "convert_dd_to_dms", "reverse_geocode_coordinates"}
+)
+# Closes a direct-return turn; the table itself is already in the tool message
+TABLE_SHOWN = "(Table shown to the user.)"
+
+
+# Long tool tables (boundary vertices, uploaded CSVs) are shown to the user in
+# full, but the model only sees this many data rows of each.
+TOOL_RESULT_MAX_ROWS = 50
+
+
+def clip_table(text: str, max_rows: int = TOOL_RESULT_MAX_ROWS) -> str:
+    """Trim each markdown table in a tool result to its header and first ``max_rows`` rows.
+
+    Lines outside the tables (e.g. notes on skipped inputs) are kept.
+    """
+    limit = max_rows + 2  # header and separator
+    kept: List[str] = []
+    table_lines = omitted = 0
+    clipped = False
+    for line in text.splitlines():
+        if line.startswith("|"):
+            table_lines += 1
+            if table_lines > limit:
+                omitted += 1
+                continue
+        else:
+            # Any other line ends the table; the next one gets its own header and limit
+            if omitted:
+                kept.append(f"({omitted} more rows omitted)")
+                clipped = True
+            table_lines = omitted = 0
+        kept.append(line)
+    if omitted:
+        kept.append(f"({omitted} more rows omitted)")
+        clipped = True
+    return "\n".join(kept) if clipped else text
+
+
+# httpx drops idle connections after 5 s by default, shorter than a typical
+# pause between chat turns; keep them for five minutes instead.
+KEEPALIVE_EXPIRY = 300.0
+
+# Request bodies smaller than this are sent as-is; gzip overhead outweighs the saving
+_GZIP_MIN_BYTES = 1024
+
+
+def async_http_client(*, gzip_requests: bool = False):
+    """Return the HTTP client to pass to ``AsyncOpenAI(http_client=...)``.
+
+    Keeps a keep-alive connection pool across turns, retries failed connects
+    once, and uses HTTP/2 when the optional ``h2`` package is installed. With
+    ``gzip_requests`` large request bodies are gzip-compressed; only for
+    servers that accept ``Content-Encoding: gzip`` on requests.
+    """
+    import gzip
+    import httpx
+    from openai import DefaultAsyncHttpxClient
+
+    class GzipTransport(httpx.AsyncHTTPTransport):
+        async def handle_async_request(self, request):
+            body = await request.aread()
+            if len(body) >= _GZIP_MIN_BYTES and "Content-Encoding" not in request.headers:
+                body = gzip.compress(body, compresslevel=6)
+                headers = request.headers.copy()
+                headers["Content-Encoding"] = "gzip"
+                headers["Content-Length"] = str(len(body))
+                request = httpx.Request(
+                    request.method,
+                    request.url,
+                    headers=headers,
+                    content=body,
+                    extensions=request.extensions,
+                )
+            return await super().handle_async_request(request)
+
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:  # HTTP/2 is optional
+        http2 = False
+    transport_cls = GzipTransport if gzip_requests else httpx.AsyncHTTPTransport
+    limits = httpx.Limits(
+        max_connections=64,
+        max_keepalive_connections=32,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    return DefaultAsyncHttpxClient(
+        transport=transport_cls(http2=http2, limits=limits, retries=1)
+    )
+
+
+# History compaction: once the transcript passes HISTORY_LIMIT messages, the
+# older turns are folded into a running summary kept right after the system prompt.
+HISTORY_LIMIT = 20
+HISTORY_KEEP = 10
+# Prefill cost follows prompt size, so long tool tables also trigger compaction.
+# Tokens are estimated at four characters each; no tokenizer is model-exact here.
+# A clipped tool table is up to ~1500 tokens, so the budget fits a few of them
+# before each turn would pay for a summary call.
+HISTORY_TOKEN_LIMIT = 6000
+SUMMARY_PREFIX = "Conversation so far: "
+SUMMARY_PROMPT = (
+    "Summarize the conversation below in at most 200 tokens. Keep place names, "
+    "coordinates and tool results the user may refer back to.\n\n"
+)
+
+
+def render_transcript(messages: List[Dict[str, Any]]) -> str:
+    """Flatten chat messages (including function and tool calls) into plain text."""
+    lines = []
+    for message in messages:
+        calls = [c["function"] for c in message.get("tool_calls") or ()]
+        if message.get("function_call"):
+            calls.append(message["function_call"])
+        for call in calls:
+            lines.append(f"assistant called {call['name']}({call['arguments']})")
+        if not calls and message.get("content"):
+            lines.append(f"{message['role']}: {message['content']}")
+    return "\n".join(lines)
+
+
+DUPLICATE_RESULT = "(Same result as a later call.)"
+
+
+def dedupe_tool_results(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace earlier copies of a repeated tool result with a short note.
+
+    The newest copy is kept, so the full table survives until compaction
+    drops the turn that produced it.
+    """
+    seen = set()
+    deduped = messages
+    for i in range(len(messages) - 1, 0, -1):
+        message = messages[i]
+        content = message.get("content")
+        if message["role"] not in ("tool", "function") or not content:
+            continue
+        if content in seen and len(content) > len(DUPLICATE_RESULT):
+            if deduped is messages:
+                deduped = list(messages)
+            deduped[i] = {**message, "content": DUPLICATE_RESULT}
+        else:
+            seen.add(content)
+    return deduped
+
+
+def approx_tokens(message: Dict[str, Any]) -> int:
+    """Rough token count of one chat message (content plus call arguments)."""
+    chars = len(message.get("content") or "")
+    for call in message.get("tool_calls") or ():
+        chars += len(call["function"]["arguments"])
+    if message.get("function_call"):
+        chars += len(message["function_call"]["arguments"])
+    return chars // 4
+
+
+async def compact_history(
+    messages: List[Dict[str, Any]],
+    summarize: Callable[[str], Awaitable[Optional[str]]],
+) -> List[Dict[str, Any]]:
+    """Fold turns beyond the recent window into the running summary message.
+
+    ``summarize`` receives the summary prompt and returns the new summary, or
+    None on failure, in which case the old turns are simply dropped.
+    """
+    # Asking for the same table twice should not put it in the prompt twice
+    messages = dedupe_tool_results(messages)
+    sizes = [approx_tokens(m) for m in messages]
+    if len(messages) <= HISTORY_LIMIT and sum(sizes) <= HISTORY_TOKEN_LIMIT:
+        return messages
+    head = 1
+    summary = ""
+    if messages[1]["role"] == "system" and messages[1]["content"].startswith(SUMMARY_PREFIX):
+        head = 2
+        summary = messages[1]["content"][len(SUMMARY_PREFIX):]
+    # Keep the newest HISTORY_KEEP messages, fewer if they pass half the token budget
+    window = len(messages) - 1
+    kept = sizes[window]
+    while (
+        window > head
+        and len(messages) - window < HISTORY_KEEP
+        and kept + sizes[window - 1] <= HISTORY_TOKEN_LIMIT // 2
+    ):
+        window -= 1
+        kept += sizes[window]
+    # Start the kept window on a user turn so no tool result loses its call
+    start = window
+    while start < len(messages) and messages[start]["role"] != "user":
+        start += 1
+    if start == len(messages):
+        # The budget cut into the latest turn; keep that turn whole anyway
+        start = window
+        while start > head and messages[start]["role"] != "user":
+            start -= 1
+    if start <= head:
+        return messages
+    dropped = render_transcript(messages[head:start])
+    if summary:
+        dropped = f"Earlier summary: {summary}\n{dropped}"
+    summary = ((await summarize(SUMMARY_PROMPT + dropped)) or "").strip() or summary
+    compacted = [messages[0]]
+    if summary:
+        compacted.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+    return compacted + messages[start:]
@@ -7,6 +7,13 @@ import subprocess
 import sys
 import os
 import argparse
+from collections import deque
+from importlib import metadata
+
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+except ImportError:  # packaging is optional; without it every requirement goes to pip
+    Requirement = None
 
 def read_requirements(file_path="requirements.txt"):
     """Read and parse requirements from requirements.txt file."""
@@ -24,6 +31,36 @@ def read_requirements(file_path="requirements.txt"):
     
     return requirements
 
+def is_satisfied(requirement):
+    """Return True if an installed distribution already meets the requirement.
+
+    A metadata lookup takes microseconds, whereas pip forks a resolver even
+    to report "Requirement already satisfied".
+    """
+    if Requirement is None:
+        return False
+    try:
+        req = Requirement(requirement)
+    except InvalidRequirement:
+        return False
+    if req.marker is not None and not req.marker.evaluate():
+        return True  # not needed on this platform
+    try:
+        installed = metadata.version(req.name)
+    except metadata.PackageNotFoundError:
+        return False
+    return req.specifier.contains(installed, prereleases=True)
+
+def run_pip(cmd):
+    """Run pip with its output streamed; return (ok, last 200 stderr lines)."""
+    # Only stderr is piped (and echoed), so pip's stdout is never held in memory
+    tail = deque(maxlen=200)
+    with subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True) as proc:
+        for line in proc.stderr:
+            sys.stderr.write(line)
+            tail.append(line)
+    return proc.returncode == 0, "".join(tail)
+
 def install_package(package, method="auto"):
     """Install a single package using pip."""
     if method == "user":
@@ -42,45 +79,59 @@ def install_package(package, method="auto"):
         # Try --user first, then fallback to --break-system-packages
         return install_package_auto(package)
     
-    try:
-        print(f"Installing {package} {method_desc}...")
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    print(f"Installing {package} {method_desc}...")
+    ok, errors = run_pip(cmd)
+    if ok:
         print(f"✓ Successfully installed {package}")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"✗ Failed to install {package}")
-        if e.stderr:
-            print(f"Error details: {e.stderr}")
-        return False
+    print(f"✗ Failed to install {package}")
+    if errors:
+        print(f"Error details: {errors}")
+    return False
 
 def install_package_auto(package):
     """Install a single package using pip with automatic fallback."""
-    try:
-        print(f"Installing {package}...")
-        # Try with --user flag first (safer for managed environments)
-        result = subprocess.run([sys.executable, "-m", "pip", "install", "--user", package], 
-                              capture_output=True, text=True, check=True)
+    print(f"Installing {package}...")
+    # Try with --user flag first (safer for managed environments)
+    ok, errors = run_pip([sys.executable, "-m", "pip", "install", "--user", package])
+    if ok:
         print(f"✓ Successfully installed {package}")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"✗ Failed to install {package} with --user flag")
-        # Try with --break-system-packages as fallback
-        try:
-            print(f"Trying alternative installation for {package}...")
-            result = subprocess.run([sys.executable, "-m", "pip", "install", "--break-system-packages", package], 
-                                  capture_output=True, text=True, check=True)
-            print(f"✓ Successfully installed {package}")
+    print(f"✗ Failed to install {package} with --user flag")
+    # Try with --break-system-packages as fallback
+    print(f"Trying alternative installation for {package}...")
+    ok, _ = run_pip([sys.executable, "-m", "pip", "install", "--break-system-packages", package])
+    if ok:
+        print(f"✓ Successfully installed {package}")
+        return True
+    print(f"✗ Failed to install {package}")
+    if errors:
+        print(f"Error details: {errors}")
+    print(f"Manual installation options:")
+    print(f"  pip install --user {package}")
+    print(f"  pip install --break-system-packages {package}")
+    return False
+
+def install_packages(packages, method="auto"):
+    """Install several packages with one pip invocation (one resolver run)."""
+    if method == "user":
+        flag_sets = [["--user"]]
+    elif method == "system":
+        flag_sets = [["--break-system-packages"]]
+    elif method == "normal":
+        flag_sets = [[]]
+    else:  # auto
+        flag_sets = [["--user"], ["--break-system-packages"]]
+    
+    for flags in flag_sets:
+        cmd = [sys.executable, "-m", "pip", "install", *flags, *packages]
+        print(f"Installing {len(packages)} packages {' '.join(flags)}...")
+        ok, _ = run_pip(cmd)
+        if ok:
+            print(f"✓ Successfully installed {', '.join(packages)}")
             return True
-        except subprocess.CalledProcessError as e2:
-            print(f"✗ Failed to install {package}")
-            if e.stderr:
-                print(f"Error details: {e.stderr}")
-            if e.stdout:
-                print(f"Output: {e.stdout}")
-            print(f"Manual installation options:")
-            print(f"  pip install --user {package}")
-            print(f"  pip install --break-system-packages {package}")
-            return False
+        print(f"✗ Batch installation failed {' '.join(flags)}")
+    return False
 
 def install_all_requirements(file_path="requirements.txt", method="auto"):
     """Install all packages from requirements file."""
@@ -95,12 +146,22 @@ def install_all_requirements(file_path="requirements.txt", method="auto"):
     for req in requirements:
         print(f"  - {req}")
     
-    print(f"\nStarting installation using method: {method}")
+    satisfied = [req for req in requirements if is_satisfied(req)]
+    pending = [req for req in requirements if req not in satisfied]
+    for req in satisfied:
+        print(f"✓ {req} is already installed")
+    success_count = len(satisfied)
     
-    success_count = 0
-    for package in requirements:
-        if install_package(package, method):
-            success_count += 1
+    if pending:
+        print(f"\nStarting installation using method: {method}")
+        # One pip run resolves all requirements together and pays pip's startup once
+        if install_packages(pending, method):
+            success_count += len(pending)
+        else:
+            print("\nRetrying one package at a time to find the failing ones...")
+            for package in pending:
+                if install_package(package, method):
+                    success_count += 1
     
     print(f"\nInstallation complete: {success_count}/{len(requirements)} packages installed successfully")
 
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from file_loaders import load_geojson, summarize_geojson_file
+
+
+def _collection(*coordinates: str) -> str:
+    features = ",".join(
+        '{"type": "Feature", "properties": {"v": NaN}, '
+        '"geometry": {"type": "Point", "coordinates": %s}}' % c
+        for c in coordinates
+    )
+    return '{"type": "FeatureCollection", "features": [%s]}' % features
+
+
+class LoadGeoJSONTests(unittest.TestCase):
+    def test_feature_collection_points(self):
+        table = load_geojson(_collection("[2.35, 48.85]", "[-0.12, 51.5]"))
+        self.assertIn("| 48.85 | 2.35 |", table)
+        self.assertIn("| 51.5 | -0.12 |", table)
+
+    def test_non_strict_json_falls_back_to_full_parse(self):
+        # The streaming parser rejects NaN/Infinity; the stdlib parser accepts them
+        table = load_geojson(_collection("[2.35, 48.85]", "[Infinity, 1e400]"))
+        self.assertIn("| 48.85 | 2.35 |", table)
+        self.assertIn("| inf | inf |", table)
+
+    def test_invalid_json_returns_empty_table(self):
+        self.assertEqual(load_geojson("{not json"), load_geojson("{}"))
+
+
+class SummarizeGeoJSONFileTests(unittest.TestCase):
+    def _summarize(self, text: str):
+        with tempfile.NamedTemporaryFile("w", suffix=".geojson", delete=False) as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        return summarize_geojson_file(f.name)
+
+    def test_summary_of_feature_collection(self):
+        text = _collection("[2.35, 48.85]").replace("NaN", "1")
+        summary = self._summarize(text)
+        self.assertIn("1 features", summary)
+        self.assertIn("lat 48.85..48.85", summary)
+
+    def test_non_strict_json_returns_none(self):
+        self.assertIsNone(self._summarize(_collection("[2.35, 48.85]")))
+
+    def test_truncated_file_returns_none(self):
+        text = _collection("[2.35, 48.85]").replace("NaN", "1")
+        self.assertIsNone(self._summarize(text[:-20]))
+
+
+if __name__ == "__main__":
+    unittest.main()
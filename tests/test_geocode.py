@@ -0,0 +1,39 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import geocode
+
+
+class MemoryCacheTests(unittest.TestCase):
+    def setUp(self):
+        geocode._found_geocode.cache_clear()
+        geocode._found_reverse.cache_clear()
+        patcher = mock.patch.object(geocode, "GEOCODE_CACHE_PATH", "")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_found_places_are_memoized(self):
+        place = SimpleNamespace(address="Paris, France", latitude=48.85, longitude=2.35)
+        with mock.patch.object(geocode, "_GEOCODE", return_value=place) as lookup:
+            for _ in range(2):
+                self.assertEqual(
+                    geocode.get_coordinates("Paris"), ("Paris, France", 48.85, 2.35)
+                )
+        self.assertEqual(lookup.call_count, 1)
+
+    def test_misses_are_retried(self):
+        with mock.patch.object(geocode, "_GEOCODE", return_value=None) as lookup:
+            for _ in range(2):
+                self.assertEqual(geocode.get_coordinates("Nowhere"), (None, None, None))
+        self.assertEqual(lookup.call_count, 2)
+
+    def test_reverse_misses_are_retried(self):
+        with mock.patch.object(geocode, "_REVERSE", return_value=None) as lookup:
+            for _ in range(2):
+                self.assertIn("Not found", geocode.reverse_geocode_coordinates("1,2"))
+        self.assertEqual(lookup.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
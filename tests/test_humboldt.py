@@ -0,0 +1,105 @@
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from humboldt import check_and_install_dependencies, execute_plan, parse_plan
+
+TOOLS = {"geocode_location", "calculate_distance"}
+
+
+class ParsePlanTests(unittest.TestCase):
+    def test_fenced_plan_is_accepted(self):
+        text = '```json\n[{"id": 1, "name": "geocode_location", "args": {"location": "Paris"}, "deps": []}]\n```'
+        plan = parse_plan(text, TOOLS)
+        self.assertEqual([node["id"] for node in plan], [1])
+
+    def test_references_become_deps(self):
+        text = (
+            '[{"id": 1, "name": "geocode_location", "args": {"location": "Paris"}},'
+            ' {"id": 2, "name": "calculate_distance", "args": {"coordinates": "$1"}}]'
+        )
+        plan = parse_plan(text, TOOLS)
+        self.assertEqual(plan[1]["deps"], [1])
+
+    def test_unknown_dep_or_reference_is_rejected(self):
+        self.assertIsNone(parse_plan(
+            '[{"id": 1, "name": "geocode_location", "args": {}, "deps": [7]}]', TOOLS
+        ))
+        self.assertIsNone(parse_plan(
+            '[{"id": 1, "name": "calculate_distance", "args": {"coordinates": "$7"}}]', TOOLS
+        ))
+
+    def test_cycle_is_rejected(self):
+        text = (
+            '[{"id": 1, "name": "geocode_location", "args": {}, "deps": [2]},'
+            ' {"id": 2, "name": "geocode_location", "args": {}, "deps": [1]}]'
+        )
+        self.assertIsNone(parse_plan(text, TOOLS))
+        self.assertIsNone(parse_plan(
+            '[{"id": 1, "name": "geocode_location", "args": {}, "deps": [1]}]', TOOLS
+        ))
+
+    def test_unusable_output_is_rejected(self):
+        self.assertIsNone(parse_plan("no tools needed", TOOLS))
+        self.assertIsNone(parse_plan("[]", TOOLS))
+        self.assertIsNone(parse_plan('[{"id": 1, "name": "rm_rf", "args": {}}]', TOOLS))
+
+
+class ExecutePlanTests(unittest.TestCase):
+    def test_dependency_output_is_substituted(self):
+        plan = parse_plan(
+            '[{"id": 1, "name": "geocode_location", "args": {"location": "Paris"}},'
+            ' {"id": 2, "name": "geocode_location", "args": {"location": "Lyon"}},'
+            ' {"id": 3, "name": "calculate_distance", "args": {"coordinates": "$1, $2"}}]',
+            TOOLS,
+        )
+        calls = []
+
+        def run_tool(name, args):
+            calls.append((name, args))
+            return {"Paris": "48.85,2.35", "Lyon": "45.76,4.84"}.get(args.get("location"), "465 km")
+
+        outputs = asyncio.run(execute_plan(plan, run_tool))
+        self.assertEqual(outputs, ["48.85,2.35", "45.76,4.84", "465 km"])
+        self.assertEqual(calls[-1], ("calculate_distance", {"coordinates": "48.85,2.35, 45.76,4.84"}))
+        self.assertEqual(plan[2]["args"], {"coordinates": "48.85,2.35, 45.76,4.84"})
+
+
+class DependencyCheckTests(unittest.TestCase):
+    def run_check(self, requirements, installed_names):
+        dists = [SimpleNamespace(metadata={"Name": name} if name else {}) for name in installed_names]
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "requirements.txt"), "w") as f:
+                f.write(requirements)
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                with mock.patch("importlib.metadata.distributions", return_value=dists), \
+                        mock.patch("subprocess.run") as run, \
+                        contextlib.redirect_stdout(io.StringIO()):
+                    check_and_install_dependencies()
+            finally:
+                os.chdir(cwd)
+        return run
+
+    def test_extras_markers_and_nameless_distributions(self):
+        run = self.run_check(
+            "# tools\nrequests[socks]>=2.0\nPyYAML ; python_version >= '3.8'\n"
+            "zope.interface~=6.0\nmissing-pkg==1.0\n",
+            ["requests", "pyyaml", "Zope_Interface", None],
+        )
+        run.assert_called_once()
+        self.assertEqual(run.call_args.args[0][-1:], ["missing-pkg==1.0"])
+
+    def test_nothing_installed_when_all_present(self):
+        run = self.run_check("openai>=1.0\ngeopy\n", ["OpenAI", "geopy", None])
+        run.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+
+from humboldt_core import (
+    DUPLICATE_RESULT,
+    HISTORY_KEEP,
+    HISTORY_LIMIT,
+    SUMMARY_PREFIX,
+    clip_table,
+    compact_history,
+    dedupe_tool_results,
+)
+
+
+def _table(rows, label="a"):
+    return "\n".join(["| name | value |", "| --- | --- |"] + [f"| {label}{i} | {i} |" for i in range(rows)])
+
+
+def _turn(i):
+    """A user question answered through one function call."""
+    return [
+        {"role": "user", "content": f"question {i}"},
+        {"role": "assistant", "content": None,
+         "function_call": {"name": "geocode_location", "arguments": f'{{"location": "place {i}"}}'}},
+        {"role": "function", "name": "geocode_location", "content": f"result {i}"},
+        {"role": "assistant", "content": f"answer {i}"},
+    ]
+
+
+def _history(turns, summary=None):
+    messages = [{"role": "system", "content": "prompt"}]
+    if summary:
+        messages.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+    for i in range(turns):
+        messages += _turn(i)
+    return messages
+
+
+class ClipTableTests(unittest.TestCase):
+    def test_short_table_is_unchanged(self):
+        text = _table(3) + "\nSkipped: `x`"
+        self.assertIs(clip_table(text, max_rows=5), text)
+
+    def test_long_table_keeps_header_and_notes(self):
+        clipped = clip_table(_table(10) + "\nSkipped: `x`", max_rows=3).splitlines()
+        self.assertEqual(clipped[:5], _table(3).splitlines())
+        self.assertEqual(clipped[5:], ["(7 more rows omitted)", "Skipped: `x`"])
+
+    def test_each_table_is_clipped_separately(self):
+        text = _table(10, "a") + "\n\n" + _table(2, "b")
+        clipped = clip_table(text, max_rows=3)
+        self.assertEqual(clipped, _table(3, "a") + "\n(7 more rows omitted)\n\n" + _table(2, "b"))
+
+
+class DedupeToolResultsTests(unittest.TestCase):
+    def test_earlier_copies_are_replaced(self):
+        messages = _history(3)
+        messages[3]["content"] = messages[7]["content"] = messages[11]["content"] = _table(5)
+        deduped = dedupe_tool_results(messages)
+        self.assertEqual([deduped[i]["content"] for i in (3, 7)], [DUPLICATE_RESULT] * 2)
+        self.assertEqual(deduped[11]["content"], _table(5))
+        self.assertEqual(messages[3]["content"], _table(5))
+
+    def test_unique_results_return_same_list(self):
+        messages = _history(3)
+        self.assertIs(dedupe_tool_results(messages), messages)
+
+
+class CompactHistoryTests(unittest.TestCase):
+    def compact(self, messages, summary="new summary"):
+        prompts = []
+
+        async def summarize(prompt):
+            prompts.append(prompt)
+            return summary
+
+        return asyncio.run(compact_history(messages, summarize)), prompts
+
+    def test_short_history_is_untouched(self):
+        messages = _history(2)
+        compacted, prompts = self.compact(messages)
+        self.assertEqual(compacted, messages)
+        self.assertEqual(prompts, [])
+
+    def test_window_starts_on_user_turn(self):
+        messages = _history(HISTORY_LIMIT // 4 + 2)
+        compacted, prompts = self.compact(messages)
+        self.assertEqual(compacted[1], {"role": "system", "content": SUMMARY_PREFIX + "new summary"})
+        self.assertEqual(compacted[2]["role"], "user")
+        self.assertLessEqual(len(compacted) - 2, HISTORY_KEEP)
+        self.assertEqual(compacted[-1], messages[-1])
+        self.assertIn("assistant called geocode_location", prompts[0])
+
+    def test_existing_summary_is_folded_in(self):
+        messages = _history(HISTORY_LIMIT // 4 + 2, summary="old summary")
+        compacted, prompts = self.compact(messages)
+        self.assertIn("Earlier summary: old summary", prompts[0])
+        summaries = [m for m in compacted if m["content"] and m["content"].startswith(SUMMARY_PREFIX)]
+        self.assertEqual(summaries, [{"role": "system", "content": SUMMARY_PREFIX + "new summary"}])
+
+    def test_failed_summary_keeps_previous_one(self):
+        messages = _history(HISTORY_LIMIT // 4 + 2, summary="old summary")
+        compacted, _ = self.compact(messages, summary=None)
+        self.assertEqual(compacted[1]["content"], SUMMARY_PREFIX + "old summary")
+        self.assertEqual(compacted[2]["role"], "user")
+
+
+if __name__ == "__main__":
+    unittest.main()
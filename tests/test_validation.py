@@ -0,0 +1,31 @@
+import unittest
+
+from distance import calculate_distance
+from validation import parse_coordinate_pairs, split_tokens
+
+
+class SplitTokensTests(unittest.TestCase):
+    def test_edge_commas_yield_empty_tokens(self):
+        self.assertEqual(split_tokens(",1, 2"), ["", "1", "2"])
+        self.assertEqual(split_tokens("1 ,"), ["1", ""])
+        self.assertEqual(split_tokens("1,, 2"), ["1", "2"])
+
+
+class ParseCoordinatePairsTests(unittest.TestCase):
+    def test_edge_commas_are_rejected_as_not_a_number(self):
+        pairs, invalid = parse_coordinate_pairs(",1,2; 1,; 3,4,")
+        self.assertEqual(pairs, [(3.0, 4.0)])
+        self.assertEqual(invalid, [(",1,2", "Not a number"), ("1,", "Not a number")])
+
+    def test_vectorized_path_matches_per_line_parser(self):
+        entries = ["10,20"] * 70 + [",1,2"]
+        pairs, invalid = parse_coordinate_pairs("\n".join(entries))
+        self.assertEqual(len(pairs), 70)
+        self.assertEqual(invalid, [(",1,2", "Not a number")])
+
+    def test_distance_rejects_leading_comma(self):
+        self.assertIn("`,0,0,0,1` (Not a number)", calculate_distance(",0,0,0,1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,9 +6,40 @@ consistent range checks and error reporting.
 
 from __future__ import annotations
 
-import re
+import io
+import warnings
 from typing import List, Sequence, Tuple
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to the per-line parser
+    np = None
+
+# Maps the semicolon separator onto newlines so `str.splitlines` handles both.
+_SEP_TABLE = str.maketrans({";": "\n"})
+
+
+def split_entries(text: str) -> List[str]:
+    """Split newline- or semicolon-delimited text into stripped, non-empty entries."""
+
+    lines = (text or "").translate(_SEP_TABLE).splitlines()
+    return [line for line in map(str.strip, lines) if line]
+
+
+def split_tokens(entry: str) -> List[str]:
+    """Split a single entry on commas and/or whitespace.
+
+    Like ``re.split(r"[,\s]+", entry)`` on a stripped entry: a leading or
+    trailing comma yields an empty token, so ",1,2" is rejected as not a number.
+    """
+
+    tokens = entry.replace(",", " ").split()
+    if entry.startswith(","):
+        tokens.insert(0, "")
+    if entry.endswith(","):
+        tokens.append("")
+    return tokens
+
 
 def is_valid_lat_lon(lat: float, lon: float) -> bool:
     """Return True if the coordinates fall within WGS84 bounds."""
@@ -16,6 +47,38 @@ def is_valid_lat_lon(lat: float, lon: float) -> bool:
     return -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0
 
 
+def valid_lat_lon_mask(lat, lon):
+    """Vectorized `is_valid_lat_lon` for NumPy arrays; returns a boolean mask."""
+
+    return (abs(lat) <= 90.0) & (abs(lon) <= 180.0)
+
+
+# Below this many entries the per-line loop beats NumPy's setup cost.
+_VECTOR_MIN_ENTRIES = 64
+
+
+def _parse_pairs_vectorized(entries: List[str]):
+    """Parse all entries in one `np.loadtxt` call; None if any line needs the slow path."""
+
+    block = "\n".join(entries)
+    if block.startswith(",") or block.endswith(",") or "\n," in block or ",\n" in block:
+        return None  # edge commas make empty tokens, which the per-line parser rejects
+    block = block.replace(",", " ")
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            arr = np.loadtxt(io.StringIO(block), ndmin=2, usecols=(0, 1), comments=None)
+    except (ValueError, Warning):
+        return None
+    if len(arr) != len(entries):
+        return None
+    ok = valid_lat_lon_mask(arr[:, 0], arr[:, 1])
+    pairs = list(map(tuple, arr[ok].tolist()))
+    reason = "Out of range (-90 <= lat <= 90, -180 <= lon <= 180)"
+    invalid = [(entries[i], reason) for i in np.flatnonzero(~ok).tolist()]
+    return pairs, invalid
+
+
 def parse_coordinate_pairs(text: str) -> Tuple[List[Tuple[float, float]], List[Tuple[str, str]]]:
     """Parse newline- or semicolon-delimited coordinates into numeric pairs.
 
@@ -23,11 +86,20 @@ def parse_coordinate_pairs(text: str) -> Tuple[List[Tuple[float, float]], List[T
     list of (raw_text, reason) tuples for display to the user.
     """
 
+    entries = split_entries(text)
+    if np is not None and len(entries) >= _VECTOR_MIN_ENTRIES:
+        parsed = _parse_pairs_vectorized(entries)
+        if parsed is not None:
+            return parsed
+
     pairs: List[Tuple[float, float]] = []
     invalid: List[Tuple[str, str]] = []
-    lines = [line.strip() for line in re.split(r"\n|;", text or "") if line.strip()]
-    for line in lines:
-        parts = re.split(r"[,\s]+", line)
+    append_pair = pairs.append
+    for line in entries:
+        # Inlined `split_tokens` and `is_valid_lat_lon`: this loop runs once per input line.
+        parts = line.replace(",", " ").split()
+        if line[0] == "," or line[-1] == ",":
+            parts = split_tokens(line)
         if len(parts) < 2:
             invalid.append((line, "Missing latitude/longitude pair"))
             continue
@@ -37,10 +109,10 @@ def parse_coordinate_pairs(text: str) -> Tuple[List[Tuple[float, float]], List[T
         except ValueError:
             invalid.append((line, "Not a number"))
             continue
-        if not is_valid_lat_lon(lat, lon):
+        if -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0:
+            append_pair((lat, lon))
+        else:
             invalid.append((line, "Out of range (-90 <= lat <= 90, -180 <= lon <= 180)"))
-            continue
-        pairs.append((lat, lon))
     return pairs, invalid
 
 
@@ -1,74 +1,218 @@
+import asyncio
+import csv
+import html
+import io
 import json
 import os
 import logging
 import re
-from openai import OpenAI
-import gradio as gr
-import folium
+import string
+import warnings
+from collections import deque
+from functools import lru_cache, partial
 from geocode import geocode_locations, reverse_geocode_coordinates
 from dd2dms import convert_dd_to_dms
 from distance import calculate_distance
+from validation import is_valid_lat_lon, valid_lat_lon_mask
+from humboldt_core import (
+    DIRECT_RETURN_TOOLS,
+    FUNCTIONS,
+    LOADER_FUNCTIONS,
+    SYSTEM_PROMPT,
+    TABLE_SHOWN,
+    async_http_client,
+    clip_table,
+    compact_history,
+)
 from file_loaders import (
     load_geojson,
     load_kml,
     load_csv,
     fetch_geo_boundaries,
+    summarize_geojson_file,
 )
 
-# Initialize OpenAI client using environment variables or defaults
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to filtering point by point
+    np = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    orjson = None
+
+# OpenAI client settings from environment variables or defaults
 BASE_URL = os.getenv("OPENAI_BASE_URL", "http://localhost:5272/v1/")
 API_KEY = os.getenv("OPENAI_API_KEY", "unused")
 MODEL_NAME = os.getenv(
     "OPENAI_MODEL", "Phi-4-mini-cpu-int4-rtn-block-32-acc-level-4-onnx"
 )
-client = OpenAI(base_url=BASE_URL, api_key=API_KEY)
+
+
+@lru_cache(maxsize=None)
+def get_client():
+    """Return the shared OpenAI client, importing the SDK on first use.
+
+    Deferring the ~0.5 s openai import lets the UI come up first, and the
+    client is created inside Gradio's event loop that will use it.
+    """
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        base_url=BASE_URL, api_key=API_KEY, http_client=async_http_client()
+    )
 
 # Configure logging similarly to humboldt.py
 DEBUG = os.getenv("HUMBOLDT_DEBUG", "0") in ("1", "true", "True")
+# Show geocode/DMS/reverse tables as the reply instead of asking the model to restate them
+DIRECT_TOOL_RETURN = os.getenv("HUMBOLDT_DIRECT_TOOL", "1") in ("1", "true", "True")
+WARMUP = os.getenv("HUMBOLDT_WARMUP", "1") in ("1", "true", "True")
 logging.basicConfig(
     level=logging.DEBUG if DEBUG else logging.INFO,
     format="%(levelname)s: %(message)s",
 )
 
-# Store log entries for display in the UI
-log_history: list[str] = []
+# Store recent log entries for display in the UI; the box is re-sent on every
+# streamed chunk, so only the newest entries are kept
+log_history: deque[str] = deque(maxlen=200)
+_log_text: str | None = None  # joined log_history, reset when a record arrives
+
+
+def current_logs() -> str:
+    """Return log_history as text, joining it again only after new records."""
+    global _log_text
+    if _log_text is None:
+        _log_text = "\n".join(log_history)
+    return _log_text
+
+
+# "Show me" is left out: "show me a map of X" would capture "a map of X"
+_LOCATION_RE = re.compile(
+    r"\b(?:for|map of|locate|where is)\s+([A-Za-z0-9, ]+)", re.IGNORECASE
+)
 
 
 def infer_location(message: str) -> str | None:
     """Return a location string if message looks like a map request."""
-    m = re.search(r"for ([A-Za-z0-9, ]+)", message, re.IGNORECASE)
+    m = _LOCATION_RE.search(message)
     if m:
         return m.group(1).strip()
     return None
 
 
+# Above this many points markers are clustered client-side by Leaflet
+_CLUSTER_MIN_POINTS = 200
+
+# Leaflet page for the map; only the point list changes between turns, so the
+# markers are built in the browser instead of as Python objects per point.
+_LEAFLET_PAGE = string.Template(
+    """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css">
+<link rel="stylesheet" href="https://unpkg.com/leaflet.markercluster@1.5.3/dist/MarkerCluster.Default.css">
+<link rel="stylesheet" href="https://unpkg.com/leaflet.markercluster@1.5.3/dist/MarkerCluster.css">
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<script src="https://unpkg.com/leaflet.markercluster@1.5.3/dist/leaflet.markercluster.js"></script>
+<style>html, body, #map { height: 100%; margin: 0; }</style>
+</head><body><div id="map"></div><script>
+var points = $points;
+// Fit all points, but never zoom in further than a single point's old view
+var map = L.map("map").fitBounds($bounds, {maxZoom: 4});
+L.tileLayer("https://tile.openstreetmap.org/{z}/{x}/{y}.png", {
+  maxZoom: 19,
+  attribution: "&copy; OpenStreetMap contributors"
+}).addTo(map);
+var layer = points.length >= $cluster_min ? L.markerClusterGroup() : L.layerGroup();
+points.forEach(function (p) { layer.addLayer(L.marker(p)); });
+layer.addTo(map);
+</script></body></html>"""
+)
+
+
 def create_map_html(points: list[tuple[float, float]]) -> str:
-    """Return HTML for a folium map with given points."""
-    if not points:
-        return ""
-    m = folium.Map(location=points[0], zoom_start=4)
-    for lat, lon in points:
-        folium.Marker([lat, lon]).add_to(m)
-    return m._repr_html_()
+    """Return HTML for a Leaflet map with given points."""
+    # Drop points Leaflet can't place; large sets are filtered in one array pass
+    if np is not None and len(points) >= _CLUSTER_MIN_POINTS:
+        arr = np.array(points, dtype=np.float64)
+        arr = arr[valid_lat_lon_mask(arr[:, 0], arr[:, 1])]
+        if not len(arr):
+            return ""
+        data = arr.tolist()
+        bounds = [arr.min(axis=0).tolist(), arr.max(axis=0).tolist()]
+    else:
+        data = [[lat, lon] for lat, lon in points if is_valid_lat_lon(lat, lon)]
+        if not data:
+            return ""
+        lats, lons = zip(*data)
+        bounds = [[min(lats), min(lons)], [max(lats), max(lons)]]
+    page = _LEAFLET_PAGE.substitute(
+        points=json.dumps(data, separators=(",", ":")),
+        bounds=json.dumps(bounds),
+        cluster_min=_CLUSTER_MIN_POINTS,
+    )
+    # gr.HTML does not run scripts, so the page goes in an iframe like folium's output
+    return (
+        '<iframe srcdoc="' + html.escape(page) + '" '
+        'style="width: 100%; height: 450px; border: none;"></iframe>'
+    )
+
+
+# Map shown before a session renders its own; each session then keeps its last
+# map in a gr.State so it persists on turns that return no new data
+DEFAULT_MAP_HTML = create_map_html([(0.0, 0.0)])
 
 
-# Last rendered map HTML so the map persists when no new data is returned
-LAST_MAP_HTML = create_map_html([(0.0, 0.0)])
+def _table_rows(table: str):
+    """Yield the body rows of a markdown table as cell lists in one csv pass.
+
+    Cells keep their padding (``float`` ignores it) and include the empty
+    cells outside the leading and trailing pipes, so column ``i`` is ``row[i + 1]``.
+    """
+    body = table.split("\n", 2)[2:]
+    if not body:
+        return iter(())
+    return csv.reader(io.StringIO(body[0]), delimiter="|", quoting=csv.QUOTE_NONE)
+
+
+# Below this many rows the csv loop beats NumPy's setup cost
+_VECTOR_MIN_ROWS = 64
+
+
+def _table_columns(table: str, columns: tuple[int, ...]):
+    """Parse table columns as floats in one `np.loadtxt` call; None if a row needs the csv path."""
+    body = table.split("\n", 2)[2:]
+    if np is None or not body or body[0].count("\n") < _VECTOR_MIN_ROWS:
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return np.loadtxt(
+                io.StringIO(body[0]),
+                delimiter="|",
+                usecols=[c + 1 for c in columns],
+                ndmin=2,
+                comments=None,
+            )
+    except (ValueError, Warning):
+        return None
 
 
 def parse_table_coordinates(
     table: str, lat_index: int, lon_index: int
 ) -> list[tuple[float, float]]:
     """Parse coordinate pairs from a markdown table."""
+    arr = _table_columns(table, (lat_index, lon_index))
+    if arr is not None:
+        return list(map(tuple, arr.tolist()))
     coords: list[tuple[float, float]] = []
-    lines = table.splitlines()[2:]
-    for line in lines:
-        cells = [c.strip() for c in line.strip().strip("|").split("|")]
-        if len(cells) <= max(lat_index, lon_index):
+    min_cells = max(lat_index, lon_index) + 3
+    for row in _table_rows(table):
+        if len(row) < min_cells:
             continue
         try:
-            lat = float(cells[lat_index])
-            lon = float(cells[lon_index])
+            lat = float(row[lat_index + 1])
+            lon = float(row[lon_index + 1])
         except ValueError:
             continue
         coords.append((lat, lon))
@@ -77,17 +221,18 @@ def parse_table_coordinates(
 
 def parse_distance_table(table: str) -> list[tuple[float, float]]:
     """Parse point A/B coordinate pairs from a distance markdown table."""
+    arr = _table_columns(table, (0, 1, 2, 3))
+    if arr is not None:
+        return list(map(tuple, arr.reshape(-1, 2).tolist()))
     coords: list[tuple[float, float]] = []
-    lines = table.splitlines()[2:]
-    for line in lines:
-        cells = [c.strip() for c in line.strip().strip("|").split("|")]
-        if len(cells) < 4:
+    for row in _table_rows(table):
+        if len(row) < 6:
             continue
         try:
-            lat1 = float(cells[0])
-            lon1 = float(cells[1])
-            lat2 = float(cells[2])
-            lon2 = float(cells[3])
+            lat1 = float(row[1])
+            lon1 = float(row[2])
+            lat2 = float(row[3])
+            lon2 = float(row[4])
         except ValueError:
             continue
         coords.extend([(lat1, lon1), (lat2, lon2)])
@@ -98,275 +243,317 @@ class GradioLogHandler(logging.Handler):
     """Logging handler that appends formatted records to log_history."""
 
     def emit(self, record: logging.LogRecord) -> None:
+        global _log_text
         log_history.append(self.format(record))
+        _log_text = None
 
 
 logging.getLogger().addHandler(GradioLogHandler())
 
-# System prompt mirrors the one in humboldt.py
-system_prompt = (
-    "You are a GeoAI Agent who is an expert GIS and Remote Sensing Analyst, "
-    "cartographer, and Geospatial Developer. Your name is Humboldt, in honor "
-    "of Alexander von Humboldt, the father of Modern Geography. You must "
-    "always use the provided function tools to perform geospatial tasks and "
-    "never guess results. When you invoke a tool it will be logged for the "
-    "user to see. If the user requests a map marker or location to be shown, "
-    "call `geocode_locations` first so the interface can display the point. "
-    "Do not claim you are unable to manipulate maps or geospatial data; use "
-    "the provided tools and let the interface handle map updates."
-)
+# Each browser session keeps its own history (a gr.State) starting from this message
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
 
-# Conversation state shared across requests
-messages = [{"role": "system", "content": system_prompt}]
-
-# Function schema for tool calls
-functions = [
-    {
-        "name": "geocode_locations",
-        "description": "Geocode a list of locations and return a markdown table",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "locations": {
-                    "type": "string",
-                    "description": "Newline- or semicolon-delimited list of locations to geocode",
-                }
-            },
-            "required": ["locations"],
-        },
-    },
-    {
-        "name": "convert_dd_to_dms",
-        "description": "Convert decimal-degree coordinates to DMS table",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "coordinates": {
-                    "type": "string",
-                    "description": "Newline- or semicolon-delimited DD lat,lon pairs",
-                }
-            },
-            "required": ["coordinates"],
-        },
-    },
-    {
-        "name": "reverse_geocode_coordinates",
-        "description": "Reverse geocode lat/lon pairs to addresses",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "coordinates": {
-                    "type": "string",
-                    "description": "Newline- or semicolon-delimited DD lat,lon pairs",
-                }
-            },
-            "required": ["coordinates"],
-        },
-    },
-    {
-        "name": "calculate_distance",
-        "description": "Calculate great-circle distance between coordinate pairs",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "coordinates": {
-                    "type": "string",
-                    "description": "Newline- or semicolon-delimited lat1,lon1,lat2,lon2 pairs",
-                }
-            },
-            "required": ["coordinates"],
-        },
-    },
-    {
-        "name": "load_geojson",
-        "description": "Load GeoJSON text and return a coordinate table",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "geojson": {
-                    "type": "string",
-                    "description": "Contents of a GeoJSON file",
-                }
-            },
-            "required": ["geojson"],
-        },
-    },
-    {
-        "name": "load_kml",
-        "description": "Load KML text and return a coordinate table",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "kml": {"type": "string", "description": "Contents of a KML file"}
-            },
-            "required": ["kml"],
-        },
-    },
-    {
-        "name": "load_csv",
-        "description": "Load CSV text with latitude/longitude columns",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "csv": {"type": "string", "description": "Contents of a CSV file"}
-            },
-            "required": ["csv"],
-        },
-    },
-    {
-        "name": "fetch_geo_boundaries",
-        "description": "Download simplified political boundaries from geoBoundaries",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "iso": {"type": "string", "description": "ISO 3166-1 alpha-3 code"},
-                "adm": {
-                    "type": "string",
-                    "description": "Administrative level",
-                    "default": "ADM0",
-                },
-            },
-            "required": ["iso"],
-        },
-    },
-]
+# Tool schema; the tools= form lets the model request several calls per turn
+TOOLS = [{"type": "function", "function": f} for f in FUNCTIONS + LOADER_FUNCTIONS]
+# Sent through extra_body, which the SDK merges into the request as-is; as a
+# typed argument it would re-walk the static schemas on every call
+TOOLS_BODY = {"tools": TOOLS}
+
+
+_table_points = partial(parse_table_coordinates, lat_index=0, lon_index=1)
+
+# Tool name -> (run it on the parsed call arguments, map points from its table)
+TOOL_DISPATCH = {
+    "geocode_locations": (
+        lambda a: geocode_locations(a["locations"]),
+        partial(parse_table_coordinates, lat_index=2, lon_index=3),
+    ),
+    "convert_dd_to_dms": (lambda a: convert_dd_to_dms(a["coordinates"]), _table_points),
+    "reverse_geocode_coordinates": (
+        lambda a: reverse_geocode_coordinates(a["coordinates"]),
+        _table_points,
+    ),
+    "load_geojson": (lambda a: load_geojson(a["geojson"]), _table_points),
+    "load_kml": (lambda a: load_kml(a["kml"]), _table_points),
+    "load_csv": (lambda a: load_csv(a["csv"]), _table_points),
+    "fetch_geo_boundaries": (
+        lambda a: fetch_geo_boundaries(a["iso"], a.get("adm", "ADM0")),
+        _table_points,
+    ),
+    "calculate_distance": (
+        lambda a: calculate_distance(a["coordinates"]),
+        parse_distance_table,
+    ),
+}
 
 
-def respond(message: str, history: list[dict], upload_file=None):
-    """Handle a chat message and return the agent's reply."""
+def _json_loads(text: str):
+    """Parse tool arguments (possibly whole GeoJSON/KML documents), orjson first."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN/Infinity literals, which the stdlib accepts
+    return json.loads(text)
+
+
+# Caps tool threads across concurrent chats; geocoders also share a rate limiter
+_TOOL_SEM = asyncio.Semaphore(4)
+
+
+async def run_tool(name: str, arguments: str) -> tuple[str, list[tuple[float, float]]]:
+    """Run one requested tool off the event loop; return its table and map points."""
+    entry = TOOL_DISPATCH.get(name)
+    if entry is None:
+        return "", []
+    logging.info("Invoking %s...", name)
+    async with _TOOL_SEM:
+        return await asyncio.to_thread(_tool_result, *entry, _json_loads(arguments))
+
+
+def _tool_result(tool, points, args) -> tuple[str, list[tuple[float, float]]]:
+    # Point parsing runs in the worker too; a long table would otherwise stall the loop
+    table = tool(args)
+    return table, points(table)
+
+
+def _rendered_map(task: asyncio.Task, last_map: str) -> str:
+    """The map from ``task`` once it has rendered, else ``last_map``."""
+    if not task.done() or task.exception() is not None:
+        return last_map
+    return task.result() or last_map
+
+
+async def _finished_map(task: asyncio.Task) -> str:
+    """Wait for the map from ``task``; "" (keep the last map) if rendering failed."""
+    await asyncio.wait([task])
+    if task.exception() is not None:
+        # The map is a side panel; a failed render shouldn't fail the chat turn
+        logging.warning("Map rendering failed: %s", task.exception())
+        return ""
+    return task.result()
+
+
+async def summarize(prompt: str) -> str | None:
+    """Condense evicted turns for `compact_history`; None if the call fails."""
+    try:
+        response = await get_client().chat.completions.create(
+            model=MODEL_NAME,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=300,
+        )
+    except Exception as e:
+        logging.warning("History summary failed: %s", e)
+        return None
+    return response.choices[0].message.content
+
+
+# Uploads up to this size go into the prompt verbatim
+UPLOAD_EXCERPT_CHARS = 10000
+
+
+def _with_upload(message: str, path: str) -> str:
+    """Append an uploaded file to the message: verbatim if small, else a streamed summary."""
+    name = os.path.basename(path)
+    is_geojson = path.lower().endswith((".geojson", ".json"))
+    if is_geojson and os.path.getsize(path) > UPLOAD_EXCERPT_CHARS:
+        # A truncated excerpt of a large GeoJSON is not valid JSON; describe it instead
+        summary = summarize_geojson_file(path)
+        if summary:
+            return f"{message}\n\nUploaded file `{name}`: {summary}"
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        file_text = f.read(UPLOAD_EXCERPT_CHARS)
+    return f"{message}\n\nUploaded file `{name}`:\n{file_text}"
+
+
+async def prefill(prefix: list[dict], **options) -> None:
+    """Send a conversation prefix with max_tokens=1 to warm the server's prefix cache."""
+    try:
+        await get_client().chat.completions.create(
+            model=MODEL_NAME, messages=prefix, max_tokens=1, **options
+        )
+    except Exception as e:
+        # Warming the cache is best-effort; the real request will still be sent
+        logging.debug("Prefill request failed: %s", e)
+
+
+async def warmup() -> None:
+    """Open the API connection and let the server cache the system prompt and tools."""
+    await prefill([SYSTEM_MESSAGE], extra_body=TOOLS_BODY)
+
+
+async def stream_reply(request: dict, calls: dict | None = None):
+    """Stream a completion, yielding the reply text received so far.
+
+    Tool call fragments are merged into ``calls`` (keyed by call index).
+    """
+    stream = await get_client().chat.completions.create(stream=True, **request)
+    text = ""
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            text += delta.content
+            yield text
+        for tc in delta.tool_calls or ():
+            call = calls.setdefault(
+                tc.index,
+                {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+            )
+            if tc.id:
+                call["id"] = tc.id
+            if tc.function and tc.function.name:
+                call["function"]["name"] += tc.function.name
+            if tc.function and tc.function.arguments:
+                call["function"]["arguments"] += tc.function.arguments
+
+
+async def respond(
+    message: str,
+    history: list[dict],
+    upload_file,
+    messages: list[dict],
+    last_map: str = DEFAULT_MAP_HTML,
+):
+    """Handle a chat message; yield (reply so far, map HTML, logs, table).
+
+    ``messages`` is the session's conversation and is updated in place;
+    ``last_map`` is the session's current map, shown until a new one renders.
+    """
     if upload_file is not None:
         try:
-            with open(upload_file.name, "r", encoding="utf-8", errors="ignore") as f:
-                file_text = f.read(10000)
-            message = f"{message}\n\nUploaded file `{os.path.basename(upload_file.name)}`:\n{file_text}"
+            message = await asyncio.to_thread(_with_upload, message, upload_file.name)
         except Exception:
             pass
     messages.append({"role": "user", "content": message})
     logging.debug("Sending to LLM: %s", messages)
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=messages,
-        functions=functions,
-        function_call="auto",
-        max_tokens=1000,
-        frequency_penalty=1,
-    )
-    msg = response.choices[0].message
-    logging.debug("LLM response: %s", msg)
-    global LAST_MAP_HTML
     map_html = ""
     table = ""
-    if msg.function_call:
-        args = json.loads(msg.function_call.arguments)
-        if msg.function_call.name == "geocode_locations":
-            logging.info("Invoking geocode_locations...")
-            table = geocode_locations(args["locations"])
-            coords = parse_table_coordinates(table, 2, 3)
-            map_html = create_map_html(coords)
-        elif msg.function_call.name == "convert_dd_to_dms":
-            logging.info("Invoking convert_dd_to_dms...")
-            table = convert_dd_to_dms(args["coordinates"])
-            coords = parse_table_coordinates(table, 0, 1)
-            map_html = create_map_html(coords)
-        elif msg.function_call.name == "reverse_geocode_coordinates":
-            logging.info("Invoking reverse_geocode_coordinates...")
-            table = reverse_geocode_coordinates(args["coordinates"])
-            coords = parse_table_coordinates(table, 0, 1)
-            map_html = create_map_html(coords)
-        elif msg.function_call.name == "load_geojson":
-            logging.info("Invoking load_geojson...")
-            table = load_geojson(args["geojson"])
-            coords = parse_table_coordinates(table, 0, 1)
-            map_html = create_map_html(coords)
-        elif msg.function_call.name == "load_kml":
-            logging.info("Invoking load_kml...")
-            table = load_kml(args["kml"])
-            coords = parse_table_coordinates(table, 0, 1)
-            map_html = create_map_html(coords)
-        elif msg.function_call.name == "load_csv":
-            logging.info("Invoking load_csv...")
-            table = load_csv(args["csv"])
-            coords = parse_table_coordinates(table, 0, 1)
-            map_html = create_map_html(coords)
-        elif msg.function_call.name == "fetch_geo_boundaries":
-            logging.info("Invoking fetch_geo_boundaries...")
-            table = fetch_geo_boundaries(args["iso"], args.get("adm", "ADM0"))
-            coords = parse_table_coordinates(table, 0, 1)
-            map_html = create_map_html(coords)
-        elif msg.function_call.name == "calculate_distance":
-            logging.info("Invoking calculate_distance...")
-            table = calculate_distance(args["coordinates"])
-            coords = parse_distance_table(table)
-            map_html = create_map_html(coords)
-        else:
-            table = ""
-        messages.append(
-            {"role": "assistant", "content": None, "function_call": msg.function_call}
-        )
-        messages.append(
-            {"role": "function", "name": msg.function_call.name, "content": table}
+    direct = False
+    reply = None
+    calls: dict = {}
+    async for reply in stream_reply(
+        {
+            "model": MODEL_NAME,
+            "messages": messages,
+            "extra_body": TOOLS_BODY,
+            "tool_choice": "auto",
+            "max_tokens": 1000,
+            "frequency_penalty": 1,
+        },
+        calls,
+    ):
+        yield reply, last_map, current_logs(), table
+    tool_calls = [calls[i] for i in sorted(calls)]
+    logging.debug("LLM response: %s %s", reply, tool_calls)
+    followup = {
+        "model": MODEL_NAME,
+        "messages": messages,
+        "max_tokens": 1000,
+        "frequency_penalty": 1,
+    }
+    if tool_calls:
+        messages.append({"role": "assistant", "content": None, "tool_calls": tool_calls})
+        # Independent tool calls (e.g. geocode + DMS) run concurrently
+        results = await asyncio.gather(
+            *(
+                run_tool(tc["function"]["name"], tc["function"]["arguments"])
+                for tc in tool_calls
+            )
         )
-        second = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=messages,
-            max_tokens=1000,
-            frequency_penalty=1,
+        coords: list[tuple[float, float]] = []
+        for tc, (tool_table, tool_points) in zip(tool_calls, results):
+            messages.append(
+                {"role": "tool", "tool_call_id": tc["id"], "content": clip_table(tool_table)}
+            )
+            coords.extend(tool_points)
+        table = "\n\n".join(t for t, _ in results if t)
+        # The map doesn't depend on the reply; render it while the follow-up streams
+        map_task = asyncio.create_task(asyncio.to_thread(create_map_html, coords))
+        direct = bool(
+            DIRECT_TOOL_RETURN
+            and table
+            and all(tc["function"]["name"] in DIRECT_RETURN_TOOLS for tc in tool_calls)
         )
-        reply = second.choices[0].message.content
-        logging.info("LLM response received")
+        if direct:
+            reply = table
+        else:
+            reply = None
+            async for reply in stream_reply(followup):
+                yield reply, _rendered_map(map_task, last_map), current_logs(), table
+            logging.info("LLM response received")
+        map_html = await _finished_map(map_task)
     else:
-        reply = msg.content
         logging.info("LLM response received")
-        location = infer_location(message)
+        # Fallback for models that skip the tool call and say nothing useful;
+        # never run it over a real answer ("where is the error in my CSV")
+        location = None if (reply or "").strip() else infer_location(message)
         if location:
             logging.info("Auto geocoding: %s", location)
-            table = geocode_locations(location)
-            coords = parse_table_coordinates(table, 2, 3)
-            map_html = create_map_html(coords)
+            arguments = json.dumps({"locations": location})
+            table, coords = await run_tool("geocode_locations", arguments)
+            map_task = asyncio.create_task(asyncio.to_thread(create_map_html, coords))
             messages.append(
                 {
                     "role": "assistant",
                     "content": None,
-                    "function_call": {
-                        "name": "geocode_locations",
-                        "arguments": json.dumps({"locations": location}),
-                    },
+                    "tool_calls": [
+                        {
+                            "id": "auto_geocode",
+                            "type": "function",
+                            "function": {
+                                "name": "geocode_locations",
+                                "arguments": arguments,
+                            },
+                        }
+                    ],
                 }
             )
             messages.append(
-                {"role": "function", "name": "geocode_locations", "content": table}
-            )
-            second = client.chat.completions.create(
-                model=MODEL_NAME,
-                messages=messages,
-                max_tokens=1000,
-                frequency_penalty=1,
+                {"role": "tool", "tool_call_id": "auto_geocode", "content": clip_table(table)}
             )
-            reply = second.choices[0].message.content
-    if map_html:
-        LAST_MAP_HTML = map_html
-    else:
-        map_html = LAST_MAP_HTML
-    messages.append({"role": "assistant", "content": reply})
-    return reply, map_html, "\n".join(log_history), table
+            # The model didn't ask for this lookup, so it still narrates the result
+            # rather than the table replacing its answer
+            reply = None
+            async for reply in stream_reply(followup):
+                yield reply, _rendered_map(map_task, last_map), current_logs(), table
+            map_html = await _finished_map(map_task)
+    map_html = map_html or last_map
+    # A direct table reply still closes the turn, so the next request sees a
+    # normal user/assistant history without a second copy of the table
+    messages.append({"role": "assistant", "content": TABLE_SHOWN if direct else reply})
+    yield reply, map_html, current_logs(), table
+    # Keep the prompt bounded: older turns collapse into a running summary. This
+    # runs after the last yield so the reply never waits on the summary call; the
+    # in-place update reaches the session state before its next turn starts.
+    messages[:] = await compact_history(messages, summarize)
 
 
-def chat(message, history, upload_file):
-    """Wrapper for respond() that formats history for gr.Chatbot."""
-    reply, map_html, logs, table = respond(message, history, upload_file)
+async def chat(message, history, upload_file, messages, last_map):
+    """Stream respond() into gr.Chatbot, updating the last assistant message."""
     # Format history for gr.Chatbot with type="messages"
     history = history + [
         {"role": "user", "content": message},
-        {"role": "assistant", "content": reply},
+        {"role": "assistant", "content": ""},
     ]
-    return history, map_html, logs, table
+    async for reply, map_html, logs, table in respond(
+        message, history, upload_file, messages, last_map
+    ):
+        history[-1] = {"role": "assistant", "content": reply}
+        yield history, map_html, logs, table, messages, map_html
 
 
 def main():
+    # Imported here so respond() and the helpers load without Gradio's import cost
+    import gradio as gr
+
     with gr.Blocks() as demo:
         with gr.Row():
             with gr.Column(scale=3):
-                map_box = gr.HTML(LAST_MAP_HTML, label="Map")
+                conversation = gr.State([SYSTEM_MESSAGE])
+                last_map = gr.State(DEFAULT_MAP_HTML)
+                map_box = gr.HTML(DEFAULT_MAP_HTML, label="Map")
                 chatbot = gr.Chatbot(type="messages")
                 message = gr.Textbox(label="Message")
                 send_btn = gr.Button("Send")
@@ -383,15 +570,20 @@ def main():
 
         send_btn.click(
             chat,
-            inputs=[message, chatbot, upload],
-            outputs=[chatbot, map_box, log_box, data_box],
+            inputs=[message, chatbot, upload, conversation, last_map],
+            outputs=[chatbot, map_box, log_box, data_box, conversation, last_map],
         )
         message.submit(
             chat,
-            inputs=[message, chatbot, upload],
-            outputs=[chatbot, map_box, log_box, data_box],
+            inputs=[message, chatbot, upload, conversation, last_map],
+            outputs=[chatbot, map_box, log_box, data_box, conversation, last_map],
         )
-    demo.launch()
+        if WARMUP:
+            # Every first turn starts with this prefix; prefill it when the page loads
+            demo.load(warmup)
+    # Sessions no longer share history, so their turns can run side by side;
+    # a bounded queue turns overload away instead of letting waits pile up
+    demo.queue(default_concurrency_limit=4, max_size=32, api_open=False).launch()
 
 
 if __name__ == "__main__":